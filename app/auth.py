@@ -1,22 +1,141 @@
-import jwt
+import hashlib
 import os
-from fastapi import HTTPException, Depends
-from fastapi.security import HTTPBearer
+import time
+from typing import Any, Dict, Optional, Sequence
+
+import jwt
+from fastapi import HTTPException, Depends, Request
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from dotenv import load_dotenv
 
+from app.cache import TTLCache
+from app.metrics import Histogram
+
 load_dotenv()
 
-security = HTTPBearer()
-
-async def verify_token(token: str = Depends(security)):
-    try:
-        payload = jwt.decode(
-            token.credentials,
-            key=os.environ["PUBLIC_CLERK_PUBLISHABLE_KEY"],
-            algorithms=['RS256']
-        )
-        return payload
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=401, detail="Token expired")
-    except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Invalid token")
\ No newline at end of file
+security = HTTPBearer(auto_error=False)
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    return default if value is None else value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _public_key_pem() -> Optional[str]:
+    # CLERK_JWT_KEY is the PEM public key from the Clerk dashboard (not the pk_... publishable key)
+    pem = os.getenv("CLERK_JWT_KEY")
+    # .env files often carry the PEM on one line with literal \n
+    return pem.replace("\\n", "\n") if pem else None
+
+
+class TokenVerifier:
+    """Verifies RS256 bearer tokens against a public key parsed once.
+    Verified claims are cached under the SHA-256 of the token until the token's
+    `exp`, so repeat requests with the same token skip the signature check.
+    Tokens without `exp` are verified every time.
+    """
+
+    def __init__(self, public_key_pem: str, algorithms: Sequence[str] = ("RS256",), cache_size: int = 10000):
+        self.algorithms = list(algorithms)
+        # Parsing the PEM is a large part of a jwt.decode call that is handed a string key
+        self._key = jwt.algorithms.RSAAlgorithm(jwt.algorithms.RSAAlgorithm.SHA256).prepare_key(public_key_pem)
+        self._claims = TTLCache(maxsize=cache_size, ttl=None)
+        self.verify_ms = Histogram([0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10])
+        self.failures = {"expired": 0, "invalid": 0}
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        cache_key = hashlib.sha256(token.encode("utf-8")).digest()
+        claims = self._claims.get(cache_key)
+        if claims is not None:
+            return claims
+
+        started = time.perf_counter()
+        try:
+            claims = jwt.decode(token, key=self._key, algorithms=self.algorithms)
+        except jwt.ExpiredSignatureError:
+            self.failures["expired"] += 1
+            raise HTTPException(status_code=401, detail="Token expired", headers={"WWW-Authenticate": "Bearer"})
+        except jwt.InvalidTokenError:
+            self.failures["invalid"] += 1
+            raise HTTPException(status_code=401, detail="Invalid token", headers={"WWW-Authenticate": "Bearer"})
+        finally:
+            self.verify_ms.observe((time.perf_counter() - started) * 1000.0)
+
+        exp = claims.get("exp")
+        if isinstance(exp, (int, float)):
+            remaining = exp - time.time()
+            if remaining > 0:
+                self._claims.set(cache_key, claims, ttl=remaining)
+        return claims
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": AUTH_ENABLED,
+            "cache": self._claims.stats(),
+            "failures": dict(self.failures),
+            "verify_ms": self.verify_ms.snapshot(),
+        }
+
+
+# Enabled by default once CLERK_JWT_KEY is set; AUTH_ENABLED=0/1 overrides
+AUTH_ENABLED = _env_flag("AUTH_ENABLED", _public_key_pem() is not None)
+
+_token_verifier: Optional[TokenVerifier] = None
+# Why the configured key could not be loaded; requests then fail closed with 503
+_key_error: Optional[str] = None
+
+
+def get_token_verifier() -> TokenVerifier:
+    """The process-wide verifier; raises HTTPException(503) when auth is on but the key is unusable"""
+    global _token_verifier, _key_error
+    if _token_verifier is None:
+        if _key_error is None:
+            pem = _public_key_pem()
+            try:
+                if not pem:
+                    raise RuntimeError("Authentication is enabled but CLERK_JWT_KEY is not set")
+                _token_verifier = TokenVerifier(pem, cache_size=int(os.getenv("AUTH_CLAIMS_CACHE_SIZE", "10000")))
+            except (RuntimeError, jwt.InvalidKeyError, ValueError) as exc:
+                _key_error = str(exc)
+        if _token_verifier is None:
+            raise HTTPException(status_code=503, detail="Authentication is not configured correctly")
+    return _token_verifier
+
+
+def init_auth() -> None:
+    """Parse the public key once at startup. When auth is on but the key is
+    missing or unparseable the error is logged and auth stays on: every
+    protected request is refused with 503 rather than served unauthenticated.
+    """
+    if AUTH_ENABLED:
+        try:
+            get_token_verifier()
+        except HTTPException:
+            print(f"❌ JWT authentication misconfigured, rejecting all /api requests: {_key_error}")
+            return
+        print("🔐 JWT authentication enabled")
+    else:
+        print("⚠️ JWT authentication disabled (set CLERK_JWT_KEY or AUTH_ENABLED=1)")
+
+
+async def verify_token(token: Optional[HTTPAuthorizationCredentials] = Depends(security)):
+    # Checked first so a misconfigured key answers 503 even for requests without a token
+    verifier = get_token_verifier()
+    if token is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    return verifier.verify(token.credentials)
+
+
+async def require_auth(request: Request, token: Optional[HTTPAuthorizationCredentials] = Depends(security)):
+    """Router-level dependency; verified claims are left on request.state.claims"""
+    if not AUTH_ENABLED:
+        return None
+    claims = await verify_token(token)
+    request.state.claims = claims
+    return claims
+
+
+def get_auth_stats() -> Dict[str, Any]:
+    if _token_verifier is None:
+        return {"enabled": AUTH_ENABLED, "key_error": _key_error}
+    return _token_verifier.stats()
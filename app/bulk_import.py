@@ -0,0 +1,274 @@
+# app/bulk_import.py
+import asyncio
+import codecs
+import csv
+import json
+import time
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+
+from app.database import db
+from app.models import TransactionImportRow
+from app.online_forecast import observe_expenses
+from app.spend_rollup import record_expenses
+
+
+class RowError(str):
+    """Parser message for a record that could not be read"""
+
+
+# Parsers yield (row_number, decoded value or RowError); row numbers are
+# 1-based record positions (the CSV header is not counted).
+ParsedRow = Tuple[int, Any]
+
+MAX_REPORTED_ERRORS = 1000
+MAX_JSON_ELEMENT_CHARS = 1 << 20
+
+_JSON_WHITESPACE = " \t\r\n"
+
+
+async def _iter_text(stream: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    # Incremental decoding: a multi-byte character may be split across chunks
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    async for chunk in stream:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+async def _iter_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    pending = ""
+    async for text in _iter_text(stream):
+        pending += text
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def parse_ndjson(stream: AsyncIterator[bytes]) -> AsyncIterator[ParsedRow]:
+    row = 0
+    async for line in _iter_lines(stream):
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            yield row, json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield row, RowError(f"Invalid JSON: {exc.msg}")
+
+
+async def parse_csv(stream: AsyncIterator[bytes]) -> AsyncIterator[ParsedRow]:
+    """CSV with a header row. A quoted field may contain newlines, so physical
+    lines are joined until the quotes balance before a record is parsed.
+    """
+    header: Optional[List[str]] = None
+    record, row = "", 0
+    async for line in _iter_lines(stream):
+        record = f"{record}\n{line}" if record else line
+        if record.count('"') % 2:
+            continue
+        values, record = next(csv.reader([record]), []), ""
+        if not any(value.strip() for value in values):
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row += 1
+        if len(values) != len(header):
+            yield row, RowError(f"Expected {len(header)} columns, got {len(values)}")
+            continue
+        # Empty cells count as missing so optional columns such as date can be left blank
+        yield row, {name: value for name, value in zip(header, values) if value != ""}
+    if record:
+        yield row + 1, RowError("Unterminated quoted field")
+
+
+async def parse_json_array(stream: AsyncIterator[bytes]) -> AsyncIterator[ParsedRow]:
+    """Decode a top-level JSON array one element at a time with raw_decode,
+    keeping only the undecoded tail of the body in memory.
+    """
+    decoder = json.JSONDecoder()
+    chunks = _iter_text(stream)
+    buffer, pos, row, started = "", 0, 0, False
+
+    async def fill() -> bool:
+        nonlocal buffer, pos
+        try:
+            text = await chunks.__anext__()
+        except StopAsyncIteration:
+            return False
+        buffer, pos = buffer[pos:] + text, 0
+        return True
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in _JSON_WHITESPACE:
+            pos += 1
+        if pos >= len(buffer):
+            if await fill():
+                continue
+            yield row + 1, RowError("Unexpected end of JSON array")
+            return
+        char = buffer[pos]
+        if not started:
+            if char != "[":
+                yield row + 1, RowError("Body must be a JSON array")
+                return
+            started, pos = True, pos + 1
+        elif char == "]":
+            return
+        elif char == "," and row:
+            pos += 1
+        else:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as exc:
+                # Probably cut off at the chunk boundary; give up once it cannot be
+                if len(buffer) - pos <= MAX_JSON_ELEMENT_CHARS and await fill():
+                    continue
+                yield row + 1, RowError(f"Invalid JSON: {exc.msg}")
+                return
+            if end == len(buffer) and await fill():
+                # A number or literal may continue in the next chunk: decode again
+                continue
+            row, pos = row + 1, end
+            yield row, value
+
+
+PARSERS = {"json": parse_json_array, "ndjson": parse_ndjson, "csv": parse_csv}
+
+
+def _format_validation_error(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" if err["loc"] else err["msg"]
+        for err in exc.errors()
+    )
+
+
+class ImportReport:
+    def __init__(self, max_errors: int = MAX_REPORTED_ERRORS):
+        self.max_errors = max_errors
+        self.rows = 0
+        self.inserted = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+
+    def fail(self, row: int, message: str) -> None:
+        self.failed += 1
+        # Only the first max_errors are kept so a bad file cannot grow the report without bound
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": row, "error": message})
+
+
+async def record_derived(user_id: str, transactions: List[Dict]) -> None:
+    """Fold stored transactions into the daily_spend rollup and the forecast
+    state. Failures are logged, not raised: the transactions are already
+    committed, and the rebuild commands of app.spend_rollup and
+    app.online_forecast repair the drift.
+    """
+    for name, update in (("daily_spend rollup", record_expenses), ("forecast state", observe_expenses)):
+        try:
+            await update(user_id, transactions)
+        except Exception as exc:
+            print(f"⚠️ {name} not updated for user {user_id}: {exc}")
+
+
+async def _stored_ids(docs: List[Dict]) -> Optional[set]:
+    """_ids of `docs` present in the collection (insert_many assigns _id client-side); None if unknown"""
+    try:
+        cursor = db.database.transactions.find({"_id": {"$in": [doc["_id"] for doc in docs if "_id" in doc]}}, {"_id": 1})
+        return {doc["_id"] async for doc in cursor}
+    except Exception:
+        return None
+
+
+async def _insert_chunk(user_id: str, docs: List[Dict], rows: List[int], report: ImportReport) -> None:
+    """Write one chunk; never raises, every row ends up inserted or in the report"""
+    failed: Dict[int, str] = {}
+    try:
+        await db.database.transactions.insert_many(docs, ordered=False)
+    except BulkWriteError as exc:
+        # Unordered: everything except the reported indexes was written
+        failed = {e["index"]: e.get("errmsg", "Write failed") for e in exc.details.get("writeErrors", [])}
+    except Exception as exc:
+        # Network error, timeout...: part of the chunk may have been written, so ask the database
+        stored_ids = await _stored_ids(docs)
+        if stored_ids is None:
+            message = f"Write failed, row may or may not be stored: {exc}"
+            failed = {index: message for index in range(len(docs))}
+        else:
+            failed = {index: f"Write failed: {exc}" for index, doc in enumerate(docs) if doc.get("_id") not in stored_ids}
+    for index, message in sorted(failed.items()):
+        report.fail(rows[index], message)
+    stored = [doc for index, doc in enumerate(docs) if index not in failed]
+    report.inserted += len(stored)
+    # Rows dated before the user's latest spending day flag the forecast state for a rebuild
+    await record_derived(user_id, stored)
+
+
+async def import_transactions(user_id: str, rows: AsyncIterator[ParsedRow], chunk_size: int = 1000) -> Dict[str, Any]:
+    """Validate parsed rows in chunks and write each chunk with one unordered
+    insert_many. While a chunk is being written the next one is parsed, and at
+    most one chunk is buffered, so memory does not grow with the file size.
+    """
+    started = time.perf_counter()
+    report = ImportReport()
+    docs: List[Dict] = []
+    doc_rows: List[int] = []
+    pending: Optional[asyncio.Task] = None
+
+    async def flush() -> None:
+        nonlocal pending, docs, doc_rows
+        if pending is not None:
+            await pending
+        pending = asyncio.create_task(_insert_chunk(user_id, docs, doc_rows, report)) if docs else None
+        docs, doc_rows = [], []
+
+    aborted: Optional[str] = None
+    try:
+        async for row, value in rows:
+            report.rows += 1
+            if isinstance(value, RowError):
+                report.fail(row, value)
+                continue
+            try:
+                item = TransactionImportRow.model_validate(value)
+            except ValidationError as exc:
+                report.fail(row, _format_validation_error(exc))
+                continue
+            doc = item.model_dump()
+            date = doc.get("date") or datetime.utcnow()
+            if date.tzinfo is not None:
+                date = date.astimezone(timezone.utc).replace(tzinfo=None)
+            doc.update(user_id=user_id, date=date)
+            docs.append(doc)
+            doc_rows.append(row)
+            if len(docs) >= chunk_size:
+                await flush()
+    except Exception as exc:
+        # E.g. the request body stream broke: keep what was read and report where it stopped
+        aborted = f"Import stopped after row {report.rows}: {exc}"
+    await flush()
+    if pending is not None:
+        await pending
+
+    duration = time.perf_counter() - started
+    report.errors.sort(key=lambda err: err["row"])
+    return {
+        "user_id": user_id,
+        "rows": report.rows,
+        "inserted": report.inserted,
+        "failed": report.failed,
+        "errors": report.errors,
+        "errors_truncated": report.failed > len(report.errors),
+        "aborted": aborted,
+        "duration_seconds": round(duration, 3),
+        "rows_per_second": round(report.rows / duration, 1) if duration > 0 else None,
+    }
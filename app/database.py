@@ -1,5 +1,6 @@
 # app/database.py
 import os
+from datetime import datetime
 from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
 import certifi
@@ -12,6 +13,14 @@ class Database:
 
 db = Database()
 
+def mongo_datetime(value: datetime) -> datetime:
+    """Truncate to the millisecond precision BSON stores, so a value echoed
+    back from an insert matches what a later read returns"""
+    return value.replace(microsecond=value.microsecond // 1000 * 1000)
+
+def utcnow_ms() -> datetime:
+    return mongo_datetime(datetime.utcnow())
+
 async def get_database():
     return db.database
 
@@ -0,0 +1,62 @@
+# app/identity_cache.py
+import os
+from typing import Dict, Optional
+
+from app.cache import TTLCache
+from app.database import db
+
+_MISSING = object()
+_NOT_FOUND = object()
+_IDENTITY_FIELDS = {"_id": 1, "clerk_user_id": 1, "email": 1, "name": 1}
+
+
+class UserIdentityCache:
+    """Resolves a clerk_user_id or email to its user without a Mongo round trip
+    on repeat lookups. A user is cached under both identifiers. Unknown
+    identifiers are cached too, with a shorter TTL: create_user clears them in
+    this process, other workers see the new user once `negative_ttl` passes.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300.0, negative_ttl: float = 30.0):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.negative_ttl = negative_ttl
+        self.negative_hits = 0
+        self.lookups = 0
+
+    async def resolve(self, identifier: str) -> Optional[Dict]:
+        """The user whose clerk_user_id or email is `identifier`, or None"""
+        cached = self._cache.get(identifier, _MISSING)
+        if cached is _NOT_FOUND:
+            self.negative_hits += 1
+            return None
+        if cached is not _MISSING:
+            return cached
+        self.lookups += 1
+        user = await db.database.users.find_one(
+            {"$or": [{"clerk_user_id": identifier}, {"email": identifier}]}, _IDENTITY_FIELDS
+        )
+        if user is None:
+            self._cache.set(identifier, _NOT_FOUND, ttl=self.negative_ttl)
+            return None
+        self.remember(user, identifier)
+        return user
+
+    def remember(self, user: Dict, *identifiers: str) -> None:
+        """Cache `user` under its identifiers, replacing any negative entries"""
+        entry = {field: user.get(field) for field in _IDENTITY_FIELDS}
+        for key in {user.get("clerk_user_id"), user.get("email"), *identifiers}:
+            if key:
+                self._cache.set(key, entry)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> Dict:
+        return {**self._cache.stats(), "negative_hits": self.negative_hits, "db_lookups": self.lookups, "negative_ttl_seconds": self.negative_ttl}
+
+
+identity_cache = UserIdentityCache(
+    maxsize=int(os.getenv("USER_IDENTITY_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("USER_IDENTITY_CACHE_TTL_SECONDS", "300")),
+    negative_ttl=float(os.getenv("USER_IDENTITY_NEGATIVE_TTL_SECONDS", "30")),
+)
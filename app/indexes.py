@@ -0,0 +1,112 @@
+# app/indexes.py
+import os
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING
+
+from app.database import db
+
+
+class IndexSpec(NamedTuple):
+    collection: str
+    keys: List[Tuple[str, int]]
+    options: Dict[str, Any] = {}
+
+
+class QueryShape(NamedTuple):
+    """A representative hot query; sample values only need the right types"""
+    name: str
+    collection: str
+    filter: Dict[str, Any]
+    sort: Optional[List[Tuple[str, int]]] = None
+
+
+INDEXES: List[IndexSpec] = [
+    IndexSpec("users", [("email", ASCENDING)]),
+    IndexSpec("users", [("clerk_user_id", ASCENDING)], {"sparse": True}),
+    IndexSpec("transactions", [("user_id", ASCENDING), ("transaction_type", ASCENDING), ("date", ASCENDING)]),
+    IndexSpec("transactions", [("user_id", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)]),
+    IndexSpec("loans", [("lender_id", ASCENDING)]),
+    IndexSpec("loans", [("borrower_id", ASCENDING)]),
+    IndexSpec("loans", [("due_date", ASCENDING), ("status", ASCENDING)]),
+    IndexSpec("notifications", [("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+    IndexSpec("notifications", [("user_id", ASCENDING), ("read", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+    IndexSpec("notifications", [("dedupe_key", ASCENDING)], {"unique": True, "sparse": True}),
+    IndexSpec("daily_spend", [("user_id", ASCENDING), ("day", ASCENDING)], {"unique": True}),
+]
+
+_SAMPLE_DATE = datetime(2000, 1, 1)
+
+QUERY_SHAPES: List[QueryShape] = [
+    QueryShape("user_by_identifier", "users", {"$or": [{"clerk_user_id": "x"}, {"email": "x"}]}),
+    QueryShape("user_by_email", "users", {"email": "x"}),
+    QueryShape("savings_expenses", "transactions", {
+        "user_id": "x", "transaction_type": "expense", "date": {"$gte": _SAMPLE_DATE},
+    }),
+    QueryShape("transactions_page", "transactions", {"user_id": "x"}, [("date", DESCENDING), ("_id", DESCENDING)]),
+    QueryShape("loans_for_user", "loans", {"$or": [{"lender_id": "x"}, {"borrower_id": "x"}]}),
+    QueryShape("overdue_sweep", "loans", {
+        "due_date": {"$lt": _SAMPLE_DATE}, "status": {"$nin": ["repaid", "overdue"]},
+    }),
+    QueryShape("notifications_inbox", "notifications", {"user_id": "x"}, [("created_at", DESCENDING), ("_id", DESCENDING)]),
+    QueryShape("notifications_unread", "notifications", {"user_id": "x", "read": False}, [("created_at", DESCENDING), ("_id", DESCENDING)]),
+    QueryShape("daily_spend_window", "daily_spend", {"user_id": "x", "day": {"$gt": _SAMPLE_DATE}}, [("day", ASCENDING)]),
+]
+
+
+async def ensure_indexes() -> None:
+    """Create every registered index. create_index is a no-op for existing
+    indexes, so this is safe to run on every startup.
+    """
+    if db.client is None or db.database is None:
+        return
+    created = 0
+    for spec in INDEXES:
+        try:
+            await db.database[spec.collection].create_index(spec.keys, background=True, **spec.options)
+            created += 1
+        except Exception as exc:
+            print(f"❌ Failed to create index {spec.collection}{spec.keys}: {exc}")
+    print(f"✅ Ensured {created}/{len(INDEXES)} MongoDB indexes")
+
+
+def _has_collscan(plan: Any) -> bool:
+    if isinstance(plan, dict):
+        if plan.get("stage") == "COLLSCAN":
+            return True
+        return any(_has_collscan(v) for v in plan.values())
+    if isinstance(plan, list):
+        return any(_has_collscan(v) for v in plan)
+    return False
+
+
+async def verify_query_plans() -> List[Dict[str, Any]]:
+    """Run explain() on every registered query shape and flag collection scans"""
+    if db.client is None or db.database is None:
+        return []
+    report = []
+    for shape in QUERY_SHAPES:
+        try:
+            cursor = db.database[shape.collection].find(shape.filter)
+            if shape.sort:
+                cursor = cursor.sort(shape.sort)
+            explain = await cursor.explain()
+            winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+            collscan = _has_collscan(winning_plan)
+            report.append({"query": shape.name, "collection": shape.collection, "collscan": collscan})
+            if collscan:
+                print(f"⚠️ Query '{shape.name}' on {shape.collection} uses a collection scan")
+        except Exception as exc:
+            report.append({"query": shape.name, "collection": shape.collection, "error": str(exc)})
+    return report
+
+
+async def bootstrap_indexes() -> None:
+    """Startup hook: ensure indexes, then optionally check plans (VERIFY_QUERY_PLANS=0 to skip)"""
+    await ensure_indexes()
+    if os.getenv("VERIFY_QUERY_PLANS", "1") != "0":
+        report = await verify_query_plans()
+        flagged = [r["query"] for r in report if r.get("collscan")]
+        if not flagged:
+            print(f"✅ Verified {len(report)} query plans: no collection scans")
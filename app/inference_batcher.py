@@ -0,0 +1,112 @@
+# app/inference_batcher.py
+import asyncio
+import os
+import time
+from typing import List, Optional, Tuple
+
+from app.inference_executor import run_inference
+from app.metrics import Histogram
+from app.ml_model import ModelVersion
+
+
+class MicroBatcher:
+	"""Coalesces concurrent single-row predictions into one vectorized predict().
+	A batch is flushed when it reaches `max_batch_size` rows or when the oldest
+	row has waited `max_wait_ms`, whichever comes first.
+	"""
+
+	def __init__(self, max_batch_size: int = 64, max_wait_ms: float = 2.0):
+		self.max_batch_size = max_batch_size
+		self.max_wait = max_wait_ms / 1000.0
+		self.batch_sizes = Histogram([1, 2, 4, 8, 16, 32, 64, 128, 256])
+		self.wait_ms = Histogram([0.5, 1, 2, 5, 10, 20, 50, 100])
+		self._queue: Optional[asyncio.Queue] = None
+		self._worker: Optional[asyncio.Task] = None
+
+	async def predict_one(self, model_version: ModelVersion, row: List[float]) -> float:
+		loop = asyncio.get_running_loop()
+		if self._worker is None or self._worker.done():
+			self._queue = asyncio.Queue()
+			self._worker = loop.create_task(self._run())
+		future = loop.create_future()
+		self._queue.put_nowait((model_version, row, future, time.perf_counter()))
+		return await future
+
+	async def _collect(self) -> List[Tuple[ModelVersion, List[float], asyncio.Future, float]]:
+		batch = [await self._queue.get()]
+		deadline = asyncio.get_running_loop().time() + self.max_wait
+		while len(batch) < self.max_batch_size:
+			if not self._queue.empty():
+				batch.append(self._queue.get_nowait())
+				continue
+			remaining = deadline - asyncio.get_running_loop().time()
+			if remaining <= 0:
+				break
+			try:
+				batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+			except asyncio.TimeoutError:
+				break
+		return batch
+
+	async def _run(self) -> None:
+		while True:
+			batch = await self._collect()
+			# Rows arriving while this batch is being predicted form the next batch
+			await self._flush(batch)
+
+	async def _flush(self, batch: List[Tuple[ModelVersion, List[float], asyncio.Future, float]]) -> None:
+		self.batch_sizes.observe(len(batch))
+		# Rows are grouped by model version: each was built with that version's feature order
+		by_version = {}
+		for item in batch:
+			by_version.setdefault(item[0], []).append(item)
+		for model_version, items in by_version.items():
+			try:
+				preds = await run_inference(model_version, [row for _, row, _, _ in items])
+			except Exception as exc:
+				preds, error = None, exc
+			now = time.perf_counter()
+			for index, (_, _, future, enqueued) in enumerate(items):
+				self.wait_ms.observe((now - enqueued) * 1000)
+				if future.done():
+					continue
+				if preds is None:
+					future.set_exception(error)
+				else:
+					future.set_result(preds[index])
+
+	async def stop(self) -> None:
+		if self._worker is not None:
+			self._worker.cancel()
+			try:
+				await self._worker
+			except asyncio.CancelledError:
+				pass
+			self._worker = None
+
+	def stats(self) -> dict:
+		return {
+			"max_batch_size": self.max_batch_size,
+			"max_wait_ms": self.max_wait * 1000,
+			"batch_size": self.batch_sizes.snapshot(),
+			"wait_ms": self.wait_ms.snapshot(),
+		}
+
+
+_batcher: Optional[MicroBatcher] = None
+
+
+def get_micro_batcher() -> Optional[MicroBatcher]:
+	"""The process-wide batcher, or None unless PREDICT_MICROBATCH=1 (opt-in)"""
+	global _batcher
+	if _batcher is None and os.getenv("PREDICT_MICROBATCH", "0") == "1":
+		_batcher = MicroBatcher(
+			max_batch_size=int(os.getenv("PREDICT_MICROBATCH_MAX_ROWS", "64")),
+			max_wait_ms=float(os.getenv("PREDICT_MICROBATCH_MAX_WAIT_MS", "2")),
+		)
+	return _batcher
+
+
+async def stop_micro_batcher() -> None:
+	if _batcher is not None:
+		await _batcher.stop()
@@ -0,0 +1,100 @@
+# app/inference_executor.py
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from itertools import chain
+from typing import Any, List, Optional
+
+import numpy as np
+
+from app.ml_model import ModelVersion, load_ml_model, registry
+
+# "inline" runs predict() on the event loop, "thread" in a thread pool and
+# "process" in a process pool whose workers each load the model once.
+INFERENCE_EXECUTOR = os.getenv("ML_INFERENCE_EXECUTOR", "thread").lower()
+INFERENCE_WORKERS = int(os.getenv("ML_INFERENCE_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Batches larger than this are split across workers and reassembled in order
+INFERENCE_CHUNK_ROWS = int(os.getenv("ML_INFERENCE_CHUNK_ROWS", "10000"))
+
+_executor: Optional[Executor] = None
+
+
+def as_float_list(pred) -> List[float]:
+	# Converts numpy arrays and plain lists alike to native floats in one pass
+	return np.asarray(pred, dtype=np.float64).ravel().tolist()
+
+
+def _predict_with(model: Any, matrix: np.ndarray) -> List[float]:
+	return as_float_list(model.predict(matrix))
+
+
+class VersionUnavailableError(Exception):
+	"""A process worker no longer has the requested model version on disk"""
+
+
+def _init_process_worker() -> None:
+	load_ml_model()
+
+
+def _predict_in_process_worker(name: str, version: str, matrix: np.ndarray) -> List[float]:
+	mv = registry.get(name, version)
+	if mv is None:
+		# The parent hot-reloaded since this worker started: pick up the file on disk
+		mv = registry.load(name)
+		if mv.version != version:
+			raise VersionUnavailableError(f"{name}@{version}")
+	return _predict_with(mv.model, matrix)
+
+
+def start_inference_executor() -> None:
+	global _executor
+	if INFERENCE_EXECUTOR == "thread":
+		_executor = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix="inference")
+	elif INFERENCE_EXECUTOR == "process":
+		# spawn: forking a process that already runs an event loop and Motor threads is unsafe
+		_executor = ProcessPoolExecutor(
+			max_workers=INFERENCE_WORKERS,
+			mp_context=multiprocessing.get_context("spawn"),
+			initializer=_init_process_worker,
+		)
+	else:
+		_executor = None
+	print(f"🧠 Inference executor: {INFERENCE_EXECUTOR} ({INFERENCE_WORKERS} workers)" if _executor else "🧠 Inference executor: inline")
+
+
+def shutdown_inference_executor() -> None:
+	global _executor
+	if _executor is not None:
+		_executor.shutdown(wait=False, cancel_futures=True)
+		_executor = None
+
+
+async def run_inference(model_version: ModelVersion, matrix) -> List[float]:
+	"""Run predict() for `model_version` off the event loop according to
+	ML_INFERENCE_EXECUTOR. Process workers keep their own copy of each model
+	version, loaded once per worker and looked up by (name, version).
+	"""
+	matrix = np.asarray(matrix, dtype=np.float64)
+	if _executor is None:
+		return _predict_with(model_version.model, matrix)
+
+	if isinstance(_executor, ProcessPoolExecutor):
+		fn = partial(_predict_in_process_worker, model_version.name, model_version.version)
+	else:
+		fn = partial(_predict_with, model_version.model)
+	loop = asyncio.get_running_loop()
+
+	async def run_chunk(chunk: np.ndarray) -> List[float]:
+		try:
+			return await loop.run_in_executor(_executor, fn, chunk)
+		except VersionUnavailableError:
+			# Pinned to a version a fresh worker cannot load any more: use the parent's copy
+			return _predict_with(model_version.model, chunk)
+
+	if len(matrix) <= INFERENCE_CHUNK_ROWS:
+		return await run_chunk(matrix)
+	chunks = [matrix[start:start + INFERENCE_CHUNK_ROWS] for start in range(0, len(matrix), INFERENCE_CHUNK_ROWS)]
+	results = await asyncio.gather(*(run_chunk(chunk) for chunk in chunks))
+	return list(chain.from_iterable(results))
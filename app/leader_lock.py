@@ -0,0 +1,145 @@
+# app/leader_lock.py
+"""Lease locks in the scheduler_locks collection, so that with several
+uvicorn workers (each running its own scheduler) a job runs in one process.
+
+A lease is one document per lock name, {_id: name, owner, expires_at, ...}.
+It is taken with a single find_one_and_update upsert that only matches when
+the lease is free, expired or already ours; a live lease held by another
+owner makes the upsert collide on _id and the acquire fails. The holder
+renews it every ttl/3 while the job runs and releases it at the end.
+Expiry is judged by each process's clock, so clock skew between hosts must
+stay well below the TTL.
+
+With a run id (e.g. the date of a nightly run), a released lease also
+records that run as completed, and later attempts for the same run fail, so
+a worker whose cron fires a little late does not repeat the job.
+"""
+import asyncio
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.database import db
+
+
+def new_owner_id() -> str:
+    """host:pid:uuid. Unique per lock instance, so two holders in one process
+    (a cron run and a manual trigger) also exclude each other.
+    """
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class LeaseLock:
+    def __init__(self, name: str, ttl_seconds: float = 120, owner: Optional[str] = None, collection=None):
+        self.name = name
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.owner = owner or new_owner_id()
+        # Any Motor-compatible collection; tests can pass an in-process stand-in
+        self._collection = collection
+        self.lost = False
+
+    @property
+    def collection(self):
+        return self._collection if self._collection is not None else db.database.scheduler_locks
+
+    async def acquire(self, run_id: Optional[str] = None) -> bool:
+        now = datetime.utcnow()
+        query = {"_id": self.name, "$or": [{"expires_at": {"$lte": now}}, {"owner": self.owner}]}
+        if run_id is not None:
+            query["completed_run"] = {"$ne": run_id}
+        try:
+            doc = await self.collection.find_one_and_update(
+                query,
+                {"$set": {"owner": self.owner, "acquired_at": now, "expires_at": now + self.ttl}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # The lock document exists but is held (or this run is already done)
+            return False
+        self.lost = False
+        return doc is not None and doc.get("owner") == self.owner
+
+    async def renew(self) -> bool:
+        result = await self.collection.update_one(
+            {"_id": self.name, "owner": self.owner},
+            {"$set": {"expires_at": datetime.utcnow() + self.ttl}},
+        )
+        if not result.matched_count:
+            self.lost = True
+        return not self.lost
+
+    async def release(self, completed_run: Optional[str] = None) -> None:
+        now = datetime.utcnow()
+        update: dict = {"expires_at": now, "released_at": now}
+        if completed_run is not None:
+            update["completed_run"] = completed_run
+        await self.collection.update_one({"_id": self.name, "owner": self.owner}, {"$set": update})
+
+    async def _keep_alive(self) -> None:
+        interval = self.ttl.total_seconds() / 3
+        while True:
+            await asyncio.sleep(interval)
+            if not await self.renew():
+                print(f"⚠️ Lease {self.name} was lost by {self.owner}; another worker may take over")
+                return
+
+
+async def run_exclusive(
+    name: str,
+    job: Callable[..., Awaitable[Any]],
+    *args,
+    run_id: Optional[str] = None,
+    ttl_seconds: float = 120,
+    collection=None,
+    **kwargs,
+) -> Optional[Any]:
+    """Run `job` only if this process takes the lease `name`, renewing it
+    while the job runs. Returns the job's result, or None when skipped.
+    A failed job does not mark the run completed.
+    """
+    lock = LeaseLock(name, ttl_seconds, collection=collection)
+    if not await lock.acquire(run_id):
+        print(f"🕒 {name} skipped: lease held elsewhere or run {run_id} already done")
+        return None
+    renewer = asyncio.create_task(lock._keep_alive())
+    completed = False
+    try:
+        result = await job(*args, **kwargs)
+        completed = True
+        return result
+    finally:
+        renewer.cancel()
+        await lock.release(run_id if completed else None)
+
+
+async def claim_shards(
+    name: str,
+    shards: Iterable[str],
+    run_id: Optional[str],
+    ttl_seconds: float = 120,
+    collection=None,
+) -> AsyncIterator[str]:
+    """Yield the shards of `name` this process claims for `run_id` (None: not
+    tied to a run), one lease per shard. Workers iterating the same shard list split them between
+    themselves. The lease is held while the consumer processes the shard and
+    is released as completed when the next shard is requested; a shard whose
+    processing raises is released without completing it.
+    """
+    for shard in shards:
+        lock = LeaseLock(f"{name}:{shard}", ttl_seconds, collection=collection)
+        if not await lock.acquire(run_id):
+            continue
+        renewer = asyncio.create_task(lock._keep_alive())
+        completed = False
+        try:
+            yield shard
+            completed = True
+        finally:
+            renewer.cancel()
+            await lock.release(run_id if completed else None)
@@ -0,0 +1,244 @@
+# app/llm_client.py
+import asyncio
+import os
+import random
+import time
+from typing import Optional
+
+
+class LLMUnavailableError(Exception):
+    """Raised when the LLM call is rejected, times out or fails upstream."""
+
+
+# ========== BACKENDS ==========
+_gemini_api_key: Optional[str] = None
+_genai = None
+
+
+def configure_gemini(api_key: Optional[str]) -> None:
+    """Record the API key; google.generativeai itself is imported and configured on first use"""
+    global _gemini_api_key, _genai
+    _gemini_api_key = api_key
+    if _genai is not None:
+        _genai.configure(api_key=api_key)
+
+
+def load_genai():
+    """Import and configure google.generativeai once (slow: most of the SDK's import cost).
+    Safe to call from a worker thread; see PRELOAD_HEAVY_MODULES in app.startup_profile.
+    """
+    global _genai
+    if _genai is None:
+        import google.generativeai as genai
+
+        if _gemini_api_key:
+            genai.configure(api_key=_gemini_api_key)
+        _genai = genai
+    return _genai
+
+
+class GeminiBackend:
+    """Calls Gemini through the native async API so the event loop is never blocked"""
+
+    def __init__(self, model_name: str = "gemini-1.5-flash"):
+        self.model_name = model_name
+
+    async def generate(self, prompt: str) -> str:
+        if not _gemini_api_key:
+            # Fails fast (and trips the breaker) without importing the SDK
+            raise RuntimeError("GEMINI_API_KEY is not set")
+        # The first call imports the SDK off the event loop
+        genai = _genai or await asyncio.to_thread(load_genai)
+        model = genai.GenerativeModel(self.model_name)
+        response = await model.generate_content_async(prompt)
+        return response.text
+
+    def __repr__(self) -> str:
+        return f"<GeminiBackend: {self.model_name}>"
+
+
+class FakeBackend:
+    """Offline backend for load tests: sleeps for a configurable latency and
+    optionally fails a fraction of calls. No network access required.
+    """
+
+    def __init__(self, latency: float = 0.05, jitter: float = 0.0, failure_rate: float = 0.0, reply: str = "Fake savings suggestions"):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.reply = reply
+        self.calls = 0
+
+    async def generate(self, prompt: str) -> str:
+        self.calls += 1
+        await asyncio.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise RuntimeError("FakeBackend simulated failure")
+        return self.reply
+
+    def __repr__(self) -> str:
+        return f"<FakeBackend: latency={self.latency}s failure_rate={self.failure_rate}>"
+
+
+# ========== CIRCUIT BREAKER ==========
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures/timeouts and rejects
+    calls until `reset_timeout` seconds have passed; then lets a single probe
+    through (half-open) and closes again if it succeeds.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+
+    def release_probe(self) -> None:
+        """End a call without a verdict (e.g. cancelled) so the next call can probe"""
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+# ========== CLIENT ==========
+class LLMClient:
+    """Async LLM client with a per-call deadline, a bounded number of in-flight
+    calls and a circuit breaker. The deadline covers waiting for a free slot too,
+    so a saturated pool degrades to the fallback instead of queueing forever;
+    a call whose deadline was shortened by that local queue counts as
+    `saturated` and leaves the breaker alone, which only reacts to the backend
+    failing or timing out with the full deadline to itself.
+    """
+
+    def __init__(self, backend, timeout: float = 8.0, max_concurrency: int = 8, breaker: Optional[CircuitBreaker] = None):
+        self.backend = backend
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.breaker = breaker or CircuitBreaker()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.stats = {"calls": 0, "succeeded": 0, "timeouts": 0, "errors": 0, "rejected": 0, "saturated": 0}
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def generate(self, prompt: str) -> str:
+        self.stats["calls"] += 1
+        if not self.breaker.allow():
+            self.stats["rejected"] += 1
+            raise LLMUnavailableError(f"circuit {self.breaker.state}")
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        semaphore = self._get_semaphore()
+        queued = semaphore.locked()
+        try:
+            try:
+                if queued:
+                    await asyncio.wait_for(semaphore.acquire(), timeout=self.timeout)
+                else:
+                    # A free slot is taken without suspending
+                    await semaphore.acquire()
+            except asyncio.TimeoutError as exc:
+                self.stats["saturated"] += 1
+                raise LLMUnavailableError(f"No free LLM slot within {self.timeout}s") from exc
+            try:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    self.stats["saturated"] += 1
+                    raise LLMUnavailableError(f"No free LLM slot within {self.timeout}s")
+                text = await asyncio.wait_for(self.backend.generate(prompt), timeout=remaining)
+            except asyncio.TimeoutError as exc:
+                if queued:
+                    # Queueing used up part of the deadline: not evidence that the backend is slow
+                    self.stats["saturated"] += 1
+                    raise LLMUnavailableError(f"LLM call did not finish within {self.timeout}s including queueing") from exc
+                self.stats["timeouts"] += 1
+                self.breaker.record_failure()
+                raise LLMUnavailableError(f"LLM call exceeded {self.timeout}s") from exc
+            except LLMUnavailableError:
+                raise
+            except Exception as exc:
+                self.stats["errors"] += 1
+                self.breaker.record_failure()
+                raise LLMUnavailableError(str(exc)) from exc
+            finally:
+                semaphore.release()
+        finally:
+            # A call that ends without a verdict (cancelled, or no free slot) must not hold the half-open probe
+            self.breaker.release_probe()
+        self.stats["succeeded"] += 1
+        self.breaker.record_success()
+        return text
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "backend": repr(self.backend),
+            "circuit_state": self.breaker.state,
+            "timeout_seconds": self.timeout,
+            "max_concurrency": self.max_concurrency,
+        }
+
+
+_client: Optional[LLMClient] = None
+
+
+def _backend_from_env():
+    if os.getenv("LLM_BACKEND", "gemini").lower() == "fake":
+        return FakeBackend(
+            latency=float(os.getenv("LLM_FAKE_LATENCY", "0.05")),
+            failure_rate=float(os.getenv("LLM_FAKE_FAILURE_RATE", "0")),
+        )
+    return GeminiBackend(os.getenv("GEMINI_MODEL", "gemini-1.5-flash"))
+
+
+def get_llm_client() -> LLMClient:
+    """Process-wide client configured from LLM_* env vars on first use."""
+    global _client
+    if _client is None:
+        _client = LLMClient(
+            _backend_from_env(),
+            timeout=float(os.getenv("LLM_TIMEOUT_SECONDS", "8")),
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.getenv("LLM_BREAKER_THRESHOLD", "5")),
+                reset_timeout=float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30")),
+            ),
+        )
+    return _client
+
+
+def set_llm_backend(backend, **kwargs) -> LLMClient:
+    """Swap in a different backend (e.g. FakeBackend for load tests)."""
+    global _client
+    _client = LLMClient(backend, **kwargs)
+    return _client
@@ -1,23 +1,56 @@
 # app/main.py
-from fastapi import FastAPI
+import time
+_import_started = time.perf_counter()
+
+from fastapi import Depends, FastAPI
 from contextlib import asynccontextmanager
 from app.database import connect_to_mongo, close_mongo_connection, db
-from app.ml_model import load_ml_model
+from app.indexes import bootstrap_indexes, verify_query_plans
+from app.ml_model import load_ml_model, start_model_watcher, stop_model_watcher
 from app.scheduler import start_scheduler, shutdown_scheduler
+from app.inference_batcher import stop_micro_batcher
+from app.inference_executor import start_inference_executor, shutdown_inference_executor
+from app.notifications import notification_sink
+from app.auth import get_auth_stats, init_auth, require_auth
+from app.startup_profile import start_background_preload, startup_profile
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
 	# Startup
 	print("🚀 Starting up Financial Management API...")
-	await connect_to_mongo()
+	phase = startup_profile.phase
+	# Parse the JWT public key once
+	with phase("init_auth"):
+		init_auth()
+	with phase("connect_to_mongo"):
+		await connect_to_mongo()
+	# Create indexes (idempotent) and flag collection scans in hot queries
+	with phase("bootstrap_indexes"):
+		await bootstrap_indexes()
+	# Buffered notification writer
+	notification_sink.start()
 	# Load ML model synchronously
-	load_ml_model()
+	with phase("load_ml_model"):
+		load_ml_model()
+	with phase("start_inference_executor"):
+		start_inference_executor()
+	# Hot-reload new model versions from ML_MODEL_PATH/ML_FEATURES_PATH
+	start_model_watcher()
 	# Start scheduler
-	start_scheduler()
+	with phase("start_scheduler"):
+		start_scheduler()
+	# Optionally import lazily loaded SDKs in the background now that we are serving
+	start_background_preload()
+	print(f"🚀 Startup phases (ms): {startup_profile.phases}")
 	yield
 	# Shutdown
 	print("🛑 Shutting down Financial Management API...")
 	shutdown_scheduler()
+	# Write out queued notifications before the Mongo client goes away
+	await notification_sink.drain()
+	await stop_model_watcher()
+	await stop_micro_batcher()
+	shutdown_inference_executor()
 	await close_mongo_connection()
 
 app = FastAPI(
@@ -32,11 +65,15 @@ from app.routers import users, transactions
 from app.routers import predict as predict_router
 from app.routers import loans as loans_router
 from app.routers import savings as savings_router
-app.include_router(users.router, prefix="/api/users", tags=["users"])
-app.include_router(transactions.router, prefix="/api/transactions", tags=["transactions"])
-app.include_router(predict_router.router, prefix="/api", tags=["predict"])
-app.include_router(loans_router.router, prefix="/api", tags=["loans", "notifications"])
-app.include_router(savings_router.router, prefix="/api", tags=["savings"])
+# Every /api route requires a bearer token when AUTH_ENABLED
+auth = [Depends(require_auth)]
+app.include_router(users.router, prefix="/api/users", tags=["users"], dependencies=auth)
+app.include_router(transactions.router, prefix="/api/transactions", tags=["transactions"], dependencies=auth)
+app.include_router(predict_router.router, prefix="/api", tags=["predict"], dependencies=auth)
+app.include_router(loans_router.router, prefix="/api", tags=["loans", "notifications"], dependencies=auth)
+app.include_router(savings_router.router, prefix="/api", tags=["savings"], dependencies=auth)
+
+startup_profile.record_import("app.main", _import_started)
 
 @app.get("/")
 async def root():
@@ -63,6 +100,21 @@ async def test_database():
 	except Exception as e:
 		return {"status": "Database error", "error": str(e)}
 
+@app.get("/debug-indexes")
+async def debug_indexes():
+	"""explain() every registered hot query and report which ones scan the whole collection"""
+	return {"query_plans": await verify_query_plans()}
+
+@app.get("/startup-profile")
+async def get_startup_profile():
+	"""Import time of app.main and duration of each lifespan startup phase"""
+	return startup_profile.report()
+
+@app.get("/metrics/auth")
+async def auth_metrics():
+	"""Token verification latency, claims-cache hit ratio and failure counts"""
+	return get_auth_stats()
+
 @app.get("/debug-env")
 async def debug_env():
 	import os
@@ -0,0 +1,26 @@
+# app/metrics.py
+import bisect
+from typing import Sequence
+
+
+class Histogram:
+	"""Fixed-bucket histogram; bucket i counts values <= bounds[i], the last bucket is overflow"""
+
+	def __init__(self, bounds: Sequence[float]):
+		self.bounds = list(bounds)
+		self.counts = [0] * (len(self.bounds) + 1)
+		self.count = 0
+		self.total = 0.0
+
+	def observe(self, value: float) -> None:
+		self.counts[bisect.bisect_left(self.bounds, value)] += 1
+		self.count += 1
+		self.total += value
+
+	def snapshot(self) -> dict:
+		labels = [f"<={b:g}" for b in self.bounds] + [f">{self.bounds[-1]:g}"]
+		return {
+			"count": self.count,
+			"mean": round(self.total / self.count, 4) if self.count else 0.0,
+			"buckets": dict(zip(labels, self.counts)),
+		}
@@ -1,12 +1,26 @@
 # app/ml_model.py
+import asyncio
+import hashlib
 import os
 import json
-from typing import Any, List, Optional
+import sys
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-try:
-	from joblib import load as joblib_load
-except Exception:  # joblib might not be installed yet
-	joblib_load = None  # type: ignore
+import numpy as np
+
+from app.simple_models import LinearSumModel, is_lsm_file
+
+
+def _joblib_loader() -> Optional[Callable[[str], Any]]:
+	# Only pickled models need joblib, so it is imported on first use rather than at startup
+	try:
+		from joblib import load as joblib_load
+	except Exception:  # joblib might not be installed yet
+		return None
+	return joblib_load
 
 
 class DummyModel:
@@ -15,63 +29,274 @@ class DummyModel:
 	"""
 
 	def predict(self, X):
-		if not X:
-			return []
+		X_arr = np.asarray(X, dtype=float)
+		if X_arr.size == 0:
+			return [0.0] * len(X_arr)
 		# Simple sum heuristic
-		return [float(sum(row)) for row in X]
+		return X_arr.reshape(len(X_arr), -1).sum(axis=1).tolist()
 
 	def __repr__(self) -> str:
 		return "<DummyModel: sum-of-features>"
 
 
-_model: Any = None
-_feature_order: Optional[List[str]] = None
-_model_path: Optional[str] = None
-_features_path: Optional[str] = None
+DEFAULT_MODEL = "default"
 
 
-def load_ml_model() -> None:
-	"""Load the ML model and optional feature order from disk.
-	Respects env vars ML_MODEL_PATH and ML_FEATURES_PATH.
+def _estimate_nbytes(obj: Any) -> int:
+	"""Rough in-memory size: the object plus any numpy arrays among its attributes.
+	Memory-mapped arrays are counted too even though their pages are shared.
 	"""
-	global _model, _feature_order, _model_path, _features_path
+	total = sys.getsizeof(obj)
+	for value in getattr(obj, "__dict__", {}).values():
+		if isinstance(value, np.ndarray):
+			total += value.nbytes
+		elif isinstance(value, (list, tuple)):
+			total += sum(v.nbytes if isinstance(v, np.ndarray) else sys.getsizeof(v) for v in value)
+		else:
+			total += sys.getsizeof(value)
+	return total
+
 
-	_model_path = os.getenv("ML_MODEL_PATH", "model.pkl")
-	_features_path = os.getenv("ML_FEATURES_PATH", os.path.splitext(_model_path)[0] + "_features.json")
+def _file_fingerprint(path: Optional[str]) -> Optional[Tuple[float, int]]:
+	if path and os.path.exists(path):
+		stat = os.stat(path)
+		return (stat.st_mtime, stat.st_size)
+	return None
 
-	# Load model
-	if _model_path and os.path.exists(_model_path) and joblib_load is not None:
+
+def _file_digest(digest, path: Optional[str]) -> None:
+	if path and os.path.exists(path):
+		with open(path, "rb") as f:
+			for block in iter(lambda: f.read(1 << 20), b""):
+				digest.update(block)
+
+
+def load_model_file(model_path: Optional[str], fallback: bool = True) -> Any:
+	"""Load a model from disk, falling back to DummyModel when that is not possible.
+	With fallback=False failures raise instead (used by hot reload to keep the current version).
+	"""
+	if model_path and is_lsm_file(model_path):
+		try:
+			# Pickle-free and memory-mapped: no unpickling, pages shared across workers
+			model = LinearSumModel.load(model_path)
+			print(f"✅ Memory-mapped LinearSumModel from {model_path}")
+			return model
+		except Exception as exc:
+			print(f"❌ Failed to load ML model at {model_path}: {exc}")
+			if not fallback:
+				raise
+			return DummyModel()
+	exists = bool(model_path) and os.path.exists(model_path)
+	joblib_load = _joblib_loader() if exists else None
+	if exists and joblib_load is not None:
 		try:
-			_model = joblib_load(_model_path)
-			print(f"✅ Loaded ML model from {_model_path}")
+			model = joblib_load(model_path)
+			print(f"✅ Loaded ML model from {model_path}")
+			return model
 		except Exception as exc:
-			print(f"❌ Failed to load ML model at {_model_path}: {exc}")
-			_model = DummyModel()
+			print(f"❌ Failed to load ML model at {model_path}: {exc}")
+			if not fallback:
+				raise
+			return DummyModel()
+	if not fallback:
+		raise FileNotFoundError(f"Cannot load model at {model_path}")
+	if exists:
+		print("⚠️ joblib not available; using DummyModel. Install joblib to load pickled models.")
 	else:
-		if joblib_load is None:
-			print("⚠️ joblib not available; using DummyModel. Install joblib to load pickled models.")
-		else:
-			print(f"⚠️ Model file not found at {_model_path}; using DummyModel fallback.")
-		_model = DummyModel()
+		print(f"⚠️ Model file not found at {model_path}; using DummyModel fallback.")
+	return DummyModel()
+
 
-	# Load feature order if provided
-	_feature_order = None
-	if _features_path and os.path.exists(_features_path):
+def load_feature_order(features_path: Optional[str]) -> Optional[List[str]]:
+	feature_order = None
+	if features_path and os.path.exists(features_path):
 		try:
-			with open(_features_path, "r") as f:
+			with open(features_path, "r") as f:
 				data = json.load(f)
 				if isinstance(data, dict) and "features" in data and isinstance(data["features"], list):
-					_feature_order = [str(x) for x in data["features"]]
+					feature_order = [str(x) for x in data["features"]]
 				elif isinstance(data, list):
-					_feature_order = [str(x) for x in data]
-				print(f"✅ Loaded feature order from {_features_path}: {_feature_order}")
+					feature_order = [str(x) for x in data]
+				print(f"✅ Loaded feature order from {features_path}: {feature_order}")
 		except Exception as exc:
-			print(f"⚠️ Failed to load features list at {_features_path}: {exc}")
+			print(f"⚠️ Failed to load features list at {features_path}: {exc}")
+	return feature_order
+
+
+class ModelVersion:
+	"""One immutable loaded model. Requests hold on to the instance they started
+	with, so a swap never changes the model or feature order mid-request.
+	"""
+
+	def __init__(self, name: str, version: str, model: Any, feature_order: Optional[List[str]], model_path: Optional[str], features_path: Optional[str], load_seconds: float, fingerprint: Tuple = ()):
+		self.name = name
+		self.version = version
+		self.model = model
+		self.feature_order = feature_order
+		self.model_path = model_path
+		self.features_path = features_path
+		self.load_seconds = load_seconds
+		self.fingerprint = fingerprint
+		self.loaded_at = datetime.utcnow()
+		self.nbytes = _estimate_nbytes(model)
+
+	def describe(self) -> Dict[str, Any]:
+		return {
+			"name": self.name,
+			"version": self.version,
+			"model": repr(self.model),
+			"model_path": self.model_path,
+			"feature_order": self.feature_order,
+			"loaded_at": self.loaded_at.isoformat(),
+			"load_seconds": round(self.load_seconds, 4),
+			"memory_bytes": self.nbytes,
+		}
+
+
+class ModelRegistry:
+	"""Named, versioned models loaded from disk. Each name keeps its last
+	`keep_versions` versions so requests can pin one; the newest is active.
+	"""
+
+	def __init__(self, keep_versions: int = 3):
+		self.keep_versions = keep_versions
+		self._sources: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+		self._fingerprints: Dict[str, Tuple] = {}
+		self._versions: Dict[str, "OrderedDict[str, ModelVersion]"] = {}
+		self._active: Dict[str, ModelVersion] = {}
+		self._listeners: List[Callable[[ModelVersion], None]] = []
+		self._watcher: Optional[asyncio.Task] = None
+
+	def register_source(self, name: str, model_path: Optional[str], features_path: Optional[str]) -> None:
+		self._sources[name] = (model_path, features_path)
+
+	def add_swap_listener(self, callback: Callable[[ModelVersion], None]) -> None:
+		self._listeners.append(callback)
+
+	def _fingerprint(self, name: str) -> Tuple:
+		model_path, features_path = self._sources[name]
+		return (_file_fingerprint(model_path), _file_fingerprint(features_path))
+
+	def _load_version(self, name: str, fallback: bool = True) -> ModelVersion:
+		model_path, features_path = self._sources[name]
+		started = time.perf_counter()
+		fingerprint = self._fingerprint(name)
+		digest = hashlib.sha1()
+		_file_digest(digest, model_path)
+		_file_digest(digest, features_path)
+		model = load_model_file(model_path, fallback=fallback)
+		version = "dummy" if isinstance(model, DummyModel) else digest.hexdigest()[:12]
+		# A feature list stored inside the model file wins over the separate features file
+		feature_order = getattr(model, "feature_order", None) or load_feature_order(features_path)
+		return ModelVersion(name, version, model, feature_order, model_path, features_path, time.perf_counter() - started, fingerprint)
+
+	def _activate(self, mv: ModelVersion) -> None:
+		versions = self._versions.setdefault(mv.name, OrderedDict())
+		versions[mv.version] = mv
+		versions.move_to_end(mv.version)
+		while len(versions) > self.keep_versions:
+			versions.popitem(last=False)
+		self._fingerprints[mv.name] = mv.fingerprint
+		previous = self._active.get(mv.name)
+		# Single reference assignment: readers see either the old or the new version
+		self._active[mv.name] = mv
+		if previous is not None and previous.version != mv.version:
+			print(f"🔁 Swapped model '{mv.name}': {previous.version} -> {mv.version}")
+			for callback in self._listeners:
+				callback(mv)
+
+	def load(self, name: str) -> ModelVersion:
+		mv = self._load_version(name)
+		self._activate(mv)
+		return mv
+
+	def load_all(self) -> None:
+		for name in list(self._sources):
+			self.load(name)
+
+	def get(self, name: str = DEFAULT_MODEL, version: Optional[str] = None) -> Optional[ModelVersion]:
+		if version is None:
+			return self._active.get(name)
+		return self._versions.get(name, {}).get(version)
+
+	def describe(self) -> List[Dict[str, Any]]:
+		return [
+			{**mv.describe(), "active": self._active.get(name) is mv}
+			for name, versions in self._versions.items()
+			for mv in versions.values()
+		]
+
+	async def _watch(self, interval: float) -> None:
+		while True:
+			await asyncio.sleep(interval)
+			for name in list(self._sources):
+				try:
+					if self._fingerprint(name) == self._fingerprints.get(name):
+						continue
+					# Load off the event loop; the swap itself is instantaneous
+					mv = await asyncio.to_thread(self._load_version, name, False)
+					active = self._active.get(name)
+					if active is not None and active.version == mv.version:
+						# Touched but unchanged content
+						self._fingerprints[name] = mv.fingerprint
+						continue
+					self._activate(mv)
+				except Exception as exc:
+					print(f"❌ Model reload for '{name}' failed: {exc}")
+
+	def start_watcher(self, interval: float) -> None:
+		if interval > 0 and (self._watcher is None or self._watcher.done()):
+			self._watcher = asyncio.get_running_loop().create_task(self._watch(interval))
+			print(f"👀 Watching model files every {interval:g}s for new versions")
+
+	async def stop_watcher(self) -> None:
+		if self._watcher is not None:
+			self._watcher.cancel()
+			try:
+				await self._watcher
+			except asyncio.CancelledError:
+				pass
+			self._watcher = None
+
+
+registry = ModelRegistry(keep_versions=int(os.getenv("ML_MODEL_KEEP_VERSIONS", "3")))
+
+
+def load_ml_model() -> None:
+	"""Load the ML model and optional feature order from disk.
+	Respects env vars ML_MODEL_PATH and ML_FEATURES_PATH (default: model.lsm if
+	present, else model.pkl); ML_EXTRA_MODELS adds more named models as
+	"name=model_path[:features_path],...".
+	"""
+	model_path = os.getenv("ML_MODEL_PATH") or ("model.lsm" if os.path.exists("model.lsm") else "model.pkl")
+	features_path = os.getenv("ML_FEATURES_PATH", os.path.splitext(model_path)[0] + "_features.json")
+	registry.register_source(DEFAULT_MODEL, model_path, features_path)
+
+	for entry in filter(None, (e.strip() for e in os.getenv("ML_EXTRA_MODELS", "").split(","))):
+		name, _, paths = entry.partition("=")
+		extra_model_path, _, extra_features_path = paths.partition(":")
+		registry.register_source(name, extra_model_path, extra_features_path or os.path.splitext(extra_model_path)[0] + "_features.json")
+
+	registry.load_all()
+
+
+def start_model_watcher() -> None:
+	registry.start_watcher(float(os.getenv("ML_MODEL_WATCH_SECONDS", "10")))
+
+
+async def stop_model_watcher() -> None:
+	await registry.stop_watcher()
+
+
+def get_model_version(name: str = DEFAULT_MODEL, version: Optional[str] = None) -> Optional[ModelVersion]:
+	return registry.get(name, version)
 
 
 def get_loaded_model() -> Any:
-	return _model
+	mv = registry.get()
+	return mv.model if mv is not None else None
 
 
 def get_feature_order() -> Optional[List[str]]:
-	return _feature_order 
\ No newline at end of file
+	mv = registry.get()
+	return mv.feature_order if mv is not None else None
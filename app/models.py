@@ -1,5 +1,5 @@
 # app/models.py
-from pydantic import BaseModel, Field, ConfigDict, field_validator
+from pydantic import BaseModel, Field, ConfigDict, field_validator, model_validator
 from typing import Optional, Literal, Dict, List
 from datetime import datetime
 from bson import ObjectId
@@ -63,18 +63,42 @@ class TransactionCreate(BaseModel):
     transaction_type: Literal["income", "expense"]
 
 
+class TransactionImportRow(TransactionCreate):
+    date: Optional[datetime] = Field(None, description="Defaults to the import time")
+
+
 # Prediction Models
 class PredictRequest(BaseModel):
+    model_config = ConfigDict(protected_namespaces=())
+
     features: Dict[str, float] = Field(..., description="Mapping of feature name to value")
+    model_name: str = Field("default", description="Registered model to use")
+    model_version: Optional[str] = Field(None, description="Pin a loaded version; defaults to the active one")
 
 
 class PredictBatchRequest(BaseModel):
-    batch: List[Dict[str, float]] = Field(..., description="List of feature mappings for batch prediction")
+    model_config = ConfigDict(protected_namespaces=())
+
+    batch: Optional[List[Dict[str, float]]] = Field(None, description="List of feature mappings for batch prediction")
+    columns: Optional[Dict[str, List[float]]] = Field(None, description="Columnar alternative to batch: feature name -> values, one per row")
+    model_name: str = Field("default", description="Registered model to use")
+    model_version: Optional[str] = Field(None, description="Pin a loaded version; defaults to the active one")
+
+    @model_validator(mode="after")
+    def check_one_format(self):
+        if (self.batch is None) == (self.columns is None):
+            raise ValueError("Provide exactly one of 'batch' or 'columns'")
+        if self.columns is not None and len({len(values) for values in self.columns.values()}) > 1:
+            raise ValueError("All columns must have the same number of values")
+        return self
 
 
 class PredictResponse(BaseModel):
+    model_config = ConfigDict(protected_namespaces=())
+
     predictions: List[float]
     used_feature_order: Optional[List[str]] = None
+    model_version: Optional[str] = None
 
 
 # Loan/IOU Models
@@ -133,4 +157,8 @@ class NotificationModel(BaseModel):
             return str(value)
         if isinstance(value, str) and ObjectId.is_valid(value):
             return str(ObjectId(value))
-        return value
\ No newline at end of file
+        return value
+
+
+class NotificationMarkReadRequest(BaseModel):
+    ids: Optional[List[str]] = Field(None, description="Notification ids to mark read; omit to mark all")
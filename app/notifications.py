@@ -0,0 +1,221 @@
+# app/notifications.py
+import argparse
+import asyncio
+import os
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.database import db
+
+
+class NotificationSink:
+	"""Process-wide buffered writer for the notifications collection.
+	Producers enqueue documents; a background task writes them with one
+	unordered bulk_write once `batch_size` are pending or the oldest has waited
+	`max_age_ms`. A full queue blocks producers (backpressure) instead of
+	growing without bound. Documents carrying a `dedupe_key` are upserted so
+	re-sent notifications are written only once. Every newly stored unread
+	notification bumps the user's counter in notification_counters.
+	"""
+
+	def __init__(self, max_queue: int = 10000, batch_size: int = 500, max_age_ms: float = 200.0):
+		self.max_queue = max_queue
+		self.batch_size = batch_size
+		self.max_age = max_age_ms / 1000.0
+		self._queue: Optional[asyncio.Queue] = None
+		self._worker: Optional[asyncio.Task] = None
+		self.stats = {"enqueued": 0, "written": 0, "flushes": 0, "failed": 0}
+
+	@property
+	def running(self) -> bool:
+		return self._worker is not None and not self._worker.done()
+
+	def start(self) -> None:
+		if not self.running:
+			self._queue = asyncio.Queue(maxsize=self.max_queue)
+			self._worker = asyncio.get_running_loop().create_task(self._run())
+
+	async def enqueue(self, doc: Dict) -> None:
+		self.stats["enqueued"] += 1
+		if not self.running:
+			# Not started (scripts, tests): write straight through
+			await self.write_batch([doc])
+			return
+		await self._queue.put(doc)
+
+	async def flush(self) -> None:
+		"""Wait until everything enqueued before this call has been written"""
+		if not self.running:
+			return
+		marker = asyncio.get_running_loop().create_future()
+		await self._queue.put(marker)
+		await marker
+
+	async def drain(self) -> None:
+		"""Flush what is queued and stop the writer (lifespan shutdown)"""
+		if not self.running:
+			return
+		await self.flush()
+		self._worker.cancel()
+		try:
+			await self._worker
+		except asyncio.CancelledError:
+			pass
+		self._worker = None
+		print(f"📨 Notification sink drained: {self.stats}")
+
+	async def write_batch(self, docs: List[Dict]) -> int:
+		"""Write `docs` now and return how many new notifications were stored.
+		Used directly by producers that already batch and need the write
+		acknowledged; errors propagate to the caller.
+		"""
+		if not docs or db.client is None or db.database is None:
+			return 0
+		ops = [
+			UpdateOne(
+				{"dedupe_key": doc["dedupe_key"]},
+				{"$setOnInsert": {k: v for k, v in doc.items() if k != "dedupe_key"}},
+				upsert=True,
+			)
+			if doc.get("dedupe_key") else InsertOne(doc)
+			for doc in docs
+		]
+		error: Optional[BulkWriteError] = None
+		try:
+			result = await db.database.notifications.bulk_write(ops, ordered=False)
+			failed, upserted = set(), set(result.upserted_ids)
+		except BulkWriteError as exc:
+			# Unordered: the other documents were still written
+			error = exc
+			failed = {e["index"] for e in exc.details.get("writeErrors", [])}
+			upserted = {u["index"] for u in exc.details.get("upserted", [])}
+		stored = [
+			doc for index, doc in enumerate(docs)
+			if (index in upserted if doc.get("dedupe_key") else index not in failed)
+		]
+		await increment_unread([doc["user_id"] for doc in stored if not doc.get("read", False)])
+		self.stats["written"] += len(stored)
+		self.stats["flushes"] += 1
+		if error is not None:
+			raise error
+		return len(stored)
+
+	async def _run(self) -> None:
+		loop = asyncio.get_running_loop()
+		while True:
+			batch: List[Dict] = []
+			markers: List[asyncio.Future] = []
+			item = await self._queue.get()
+			deadline = loop.time() + self.max_age
+			while True:
+				if isinstance(item, asyncio.Future):
+					# Flush request: write what we have right away
+					markers.append(item)
+					break
+				batch.append(item)
+				if len(batch) >= self.batch_size:
+					break
+				remaining = deadline - loop.time()
+				if remaining <= 0:
+					break
+				try:
+					item = await asyncio.wait_for(self._queue.get(), remaining)
+				except asyncio.TimeoutError:
+					break
+			try:
+				await self.write_batch(batch)
+			except Exception as exc:
+				self.stats["failed"] += len(batch)
+				print(f"❌ Failed to write {len(batch)} notifications: {exc}")
+			for marker in markers:
+				if not marker.done():
+					marker.set_result(None)
+
+	def get_stats(self) -> Dict:
+		return {**self.stats, "queued": self._queue.qsize() if self._queue is not None else 0, "running": self.running}
+
+
+async def increment_unread(user_ids: List[str], by: int = 1) -> None:
+	"""$inc the per-user unread counters; one upsert per distinct user"""
+	counts = Counter(user_ids)
+	if not counts or db.client is None or db.database is None:
+		return
+	await db.database.notification_counters.bulk_write([
+		UpdateOne({"_id": user_id}, {"$inc": {"unread": n * by}}, upsert=True)
+		for user_id, n in counts.items()
+	], ordered=False)
+
+
+async def get_unread_count(user_id: str) -> int:
+	doc = await db.database.notification_counters.find_one({"_id": user_id}, {"unread": 1})
+	# Clamp: a counter can only dip below zero through drift, which a rebuild repairs
+	return max(0, int(doc["unread"])) if doc else 0
+
+
+async def mark_read(user_id: str, ids: Optional[List] = None) -> int:
+	"""Mark the given notifications (or all of them) read with one update_many.
+	modified_count only includes documents that were unread, so the counter
+	stays exact even when two clients mark the same notifications concurrently.
+	"""
+	query: Dict = {"user_id": user_id, "read": False}
+	if ids is not None:
+		query["_id"] = {"$in": ids}
+	result = await db.database.notifications.update_many(query, {"$set": {"read": True, "read_at": datetime.utcnow()}})
+	if result.modified_count:
+		await db.database.notification_counters.update_one(
+			{"_id": user_id}, {"$inc": {"unread": -result.modified_count}}, upsert=True
+		)
+	return result.modified_count
+
+
+async def rebuild_unread_counters() -> Dict:
+	"""Recount unread notifications per user from scratch (drift repair)"""
+	if db.client is None or db.database is None:
+		raise ValueError("Database connection not available")
+	started = datetime.utcnow()
+	rows = await db.database.notifications.aggregate([
+		{"$match": {"read": False}},
+		{"$group": {"_id": "$user_id", "unread": {"$sum": 1}}},
+	]).to_list(None)
+	if rows:
+		await db.database.notification_counters.bulk_write([
+			UpdateOne({"_id": row["_id"]}, {"$set": {"unread": row["unread"]}}, upsert=True)
+			for row in rows
+		], ordered=False)
+	zeroed = await db.database.notification_counters.update_many(
+		{"_id": {"$nin": [row["_id"] for row in rows]}, "unread": {"$ne": 0}}, {"$set": {"unread": 0}}
+	)
+	return {
+		"users": len(rows),
+		"zeroed": zeroed.modified_count,
+		"duration_seconds": round((datetime.utcnow() - started).total_seconds(), 3),
+	}
+
+
+notification_sink = NotificationSink(
+	max_queue=int(os.getenv("NOTIFICATION_QUEUE_SIZE", "10000")),
+	batch_size=int(os.getenv("NOTIFICATION_BATCH_SIZE", "500")),
+	max_age_ms=float(os.getenv("NOTIFICATION_MAX_AGE_MS", "200")),
+)
+
+
+async def _main() -> None:
+	from app.database import connect_to_mongo, close_mongo_connection
+
+	parser = argparse.ArgumentParser(description="Maintain notification unread counters")
+	parser.add_argument("command", choices=["rebuild-counters"])
+	parser.parse_args()
+
+	await connect_to_mongo()
+	try:
+		print(f"✅ Unread counters rebuilt: {await rebuild_unread_counters()}")
+	finally:
+		await close_mongo_connection()
+
+
+if __name__ == "__main__":
+	asyncio.run(_main())
@@ -0,0 +1,301 @@
+# app/online_forecast.py
+"""Online Holt-Winters forecaster: additive level, trend and 7-day seasonal
+state kept per user in the forecast_state collection.
+
+The state holds every closed day folded in plus the running total of the
+latest ("open") day, so recording an expense is O(1):
+  - same day as the open day: one atomic $inc;
+  - a later day: the open day (and any empty days in between) is folded in
+    and the new day opened, written with an optimistic check on `rev`;
+  - an earlier day (backdated or out-of-order import): the state cannot be
+    updated in place, so it is flagged needs_rebuild and rebuilt from the
+    daily_spend rollup the next time a forecast is asked for.
+
+    python -m app.online_forecast rebuild [--user-id ID] [--flagged-only]
+"""
+import argparse
+import asyncio
+import os
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from app.database import db
+from app.spend_rollup import day_start
+
+# State document, one per user:
+#   {_id: user_id, level, trend, season: [7 floats indexed by weekday],
+#    observed_days, current_day, current_total, rev, needs_rebuild, updated_at}
+
+SEASON_LENGTH = 7
+FORECAST_ALPHA = float(os.getenv("FORECAST_ALPHA", "0.3"))
+FORECAST_BETA = float(os.getenv("FORECAST_BETA", "0.05"))
+FORECAST_GAMMA = float(os.getenv("FORECAST_GAMMA", "0.3"))
+# Attempts at the optimistic day-rollover write before the state is flagged for a rebuild
+MAX_ROLLOVER_ATTEMPTS = 5
+
+_ONE_DAY = timedelta(days=1)
+_STATE_FIELDS = ("level", "trend", "season", "observed_days", "current_day", "current_total")
+
+
+# ========== Model ==========
+def new_state(day: datetime, amount: float = 0.0) -> Dict[str, Any]:
+    return {
+        "level": 0.0,
+        "trend": 0.0,
+        "season": [0.0] * SEASON_LENGTH,
+        "observed_days": 0,
+        "current_day": day,
+        "current_total": float(amount),
+    }
+
+
+def fold_day(state: Dict[str, Any], value: float, day: datetime) -> None:
+    """Fold one closed day's total into level, trend and season (in place).
+    The first SEASON_LENGTH days only warm up: level is their mean and each
+    weekday's seasonal term its deviation from that mean.
+    """
+    season = state["season"]
+    weekday = day.weekday()
+    n = state["observed_days"]
+    if n < SEASON_LENGTH:
+        state["level"] = (state["level"] * n + value) / (n + 1)
+        season[weekday] = value
+        if n + 1 == SEASON_LENGTH:
+            state["season"] = [s - state["level"] for s in season]
+    else:
+        level, trend = state["level"], state["trend"]
+        new_level = FORECAST_ALPHA * (value - season[weekday]) + (1 - FORECAST_ALPHA) * (level + trend)
+        state["trend"] = FORECAST_BETA * (new_level - level) + (1 - FORECAST_BETA) * trend
+        season[weekday] = FORECAST_GAMMA * (value - new_level) + (1 - FORECAST_GAMMA) * season[weekday]
+        state["level"] = new_level
+    state["observed_days"] = n + 1
+
+
+def advance_to(state: Dict[str, Any], day: datetime) -> None:
+    """Close the open day, fold zero for every day without expenses up to
+    `day`, and open `day` with a zero total
+    """
+    current = state["current_day"]
+    fold_day(state, state["current_total"], current)
+    current += _ONE_DAY
+    while current < day:
+        fold_day(state, 0.0, current)
+        current += _ONE_DAY
+    state["current_day"], state["current_total"] = day, 0.0
+
+
+def forecast_from_state(state: Dict[str, Any], horizon: int = 7) -> Tuple[np.ndarray, np.ndarray]:
+    """Forecast the `horizon` days after the open day, which is counted as
+    observed (like the last day of the linear fit). Negative forecasts are
+    clipped to zero. Empty when fewer than two days have been seen.
+    """
+    if state["observed_days"] + 1 < 2:
+        return np.array([], dtype="datetime64[us]"), np.array([], dtype=np.float64)
+    state = {**state, "season": list(state["season"])}
+    last_day = state["current_day"]
+    fold_day(state, state["current_total"], last_day)
+    steps = np.arange(1, horizon + 1)
+    values = state["level"] + steps * state["trend"]
+    if state["observed_days"] >= SEASON_LENGTH:
+        values = values + np.asarray(state["season"])[(last_day.weekday() + steps) % SEASON_LENGTH]
+    dates = np.datetime64(last_day, "us") + steps * np.timedelta64(1, "D")
+    return dates, np.maximum(values, 0.0)
+
+
+def build_state(days: Iterable[Tuple[datetime, float]]) -> Optional[Dict[str, Any]]:
+    """State after replaying daily totals (oldest first, gaps allowed); the
+    last day is left open. None when there are no days.
+    """
+    state: Optional[Dict[str, Any]] = None
+    for day, total in days:
+        if state is None:
+            state = new_state(day)
+        elif day > state["current_day"]:
+            advance_to(state, day)
+        state["current_total"] += total
+    return state
+
+
+# ========== Persistence ==========
+def _collection():
+    return db.database.forecast_state
+
+
+async def observe_expenses(user_id: str, transactions: Iterable[Dict]) -> None:
+    """Fold newly inserted transactions into the user's state. Users without
+    a state are skipped: it is built from daily_spend on their first forecast.
+    """
+    if db.client is None or db.database is None:
+        return
+    increments: Dict[datetime, float] = defaultdict(float)
+    for tx in transactions:
+        if tx.get("transaction_type") == "expense":
+            increments[day_start(tx.get("date") or datetime.utcnow())] += tx["amount"]
+    if not increments:
+        return
+    now = datetime.utcnow()
+
+    if len(increments) == 1:
+        # Fast path: more spending on the open day
+        (day, amount), = increments.items()
+        result = await _collection().update_one(
+            {"_id": user_id, "current_day": day},
+            {"$inc": {"current_total": amount, "rev": 1}, "$set": {"updated_at": now}},
+        )
+        if result.matched_count:
+            return
+
+    for _ in range(MAX_ROLLOVER_ATTEMPTS):
+        doc = await _collection().find_one({"_id": user_id})
+        if doc is None or doc.get("needs_rebuild"):
+            return
+        if min(increments) < doc["current_day"]:
+            break
+        state = {field: doc[field] for field in _STATE_FIELDS}
+        for day in sorted(increments):
+            if day > state["current_day"]:
+                advance_to(state, day)
+            state["current_total"] += increments[day]
+        # Any write since the read (including a same-day $inc) bumps rev, so this retries
+        result = await _collection().update_one(
+            {"_id": user_id, "rev": doc["rev"]},
+            {"$set": {**state, "updated_at": now}, "$inc": {"rev": 1}},
+        )
+        if result.matched_count:
+            return
+    await _collection().update_one({"_id": user_id}, {"$set": {"needs_rebuild": True, "updated_at": now}})
+
+
+async def _daily_totals(user_id: str) -> List[Tuple[datetime, float]]:
+    cursor = db.database.daily_spend.find({"user_id": user_id}, {"_id": 0, "day": 1, "total": 1}).sort("day", 1)
+    return [(doc["day"], doc["total"]) async for doc in cursor]
+
+
+async def rebuild_user_state(user_id: str) -> Optional[Dict[str, Any]]:
+    """Replay the user's daily_spend rollup into a fresh state. The write is
+    skipped if the state changed meanwhile; the rebuilt state is returned
+    either way.
+    """
+    if db.client is None or db.database is None:
+        raise ValueError("Database connection not available")
+    current = await _collection().find_one({"_id": user_id}, {"rev": 1})
+    state = build_state(await _daily_totals(user_id))
+    if state is None:
+        return None
+    fields = {**state, "needs_rebuild": False, "updated_at": datetime.utcnow()}
+    if current is None:
+        try:
+            await _collection().insert_one({"_id": user_id, **fields, "rev": 1})
+        except DuplicateKeyError:
+            pass
+    else:
+        await _collection().update_one({"_id": user_id, "rev": current["rev"]}, {"$set": fields, "$inc": {"rev": 1}})
+    return state
+
+
+async def get_state_forecast(user_id: str, horizon: int = 7) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """(dates, values) from the stored state, rebuilding it first when it is
+    missing or flagged. None when the user has no spending history.
+    """
+    if db.client is None or db.database is None:
+        return None
+    state = await _collection().find_one({"_id": user_id})
+    if state is None or state.get("needs_rebuild"):
+        state = await rebuild_user_state(user_id)
+    if state is None:
+        return None
+    return forecast_from_state(state, horizon)
+
+
+async def get_state_forecasts(user_ids: List[str], horizon: int = 7) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """get_state_forecast for a batch of users with one read of their states;
+    missing or flagged states are rebuilt one user at a time. Users with no
+    spending history are left out.
+    """
+    if db.client is None or db.database is None or not user_ids:
+        return {}
+    states = {doc["_id"]: doc async for doc in _collection().find({"_id": {"$in": list(user_ids)}})}
+    forecasts = {}
+    for user_id in user_ids:
+        state = states.get(user_id)
+        if state is None or state.get("needs_rebuild"):
+            state = await rebuild_user_state(user_id)
+        if state is not None:
+            forecasts[user_id] = forecast_from_state(state, horizon)
+    return forecasts
+
+
+async def rebuild_forecast_states(user_id: Optional[str] = None, flagged_only: bool = False, batch_size: int = 1000) -> Dict:
+    """Rebuild states from daily_spend in one pass over the rollup, sorted by
+    (user_id, day) so it follows the rollup's unique index. Like
+    rebuild_daily_spend, best run while writes are quiet: a transaction
+    recorded between the read and the write of a user is lost from the state.
+    """
+    if db.client is None or db.database is None:
+        raise ValueError("Database connection not available")
+    started = time.perf_counter()
+    query: Dict = {}
+    if user_id is not None:
+        query["user_id"] = user_id
+    elif flagged_only:
+        flagged = [doc["_id"] async for doc in _collection().find({"needs_rebuild": True}, {"_id": 1})]
+        query["user_id"] = {"$in": flagged}
+    cursor = db.database.daily_spend.find(query, {"_id": 0, "user_id": 1, "day": 1, "total": 1}).sort([("user_id", 1), ("day", 1)])
+
+    stats = {"users": 0, "days_replayed": 0}
+    ops: List[UpdateOne] = []
+
+    def add(user: str, days: List[Tuple[datetime, float]]) -> None:
+        state = build_state(days)
+        ops.append(UpdateOne(
+            {"_id": user},
+            {"$set": {**state, "needs_rebuild": False, "updated_at": datetime.utcnow()}, "$inc": {"rev": 1}},
+            upsert=True,
+        ))
+        stats["users"] += 1
+        stats["days_replayed"] += len(days)
+
+    current_user, days = None, []
+    async for doc in cursor:
+        if doc["user_id"] != current_user:
+            if days:
+                add(current_user, days)
+            current_user, days = doc["user_id"], []
+        days.append((doc["day"], doc["total"]))
+        if len(ops) >= batch_size:
+            await _collection().bulk_write(ops, ordered=False)
+            ops = []
+    if days:
+        add(current_user, days)
+    if ops:
+        await _collection().bulk_write(ops, ordered=False)
+
+    stats["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return stats
+
+
+async def _main() -> None:
+    from app.database import connect_to_mongo, close_mongo_connection
+
+    parser = argparse.ArgumentParser(description="Maintain the forecast_state collection")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--user-id", default=None, help="Only rebuild this user's state")
+    parser.add_argument("--flagged-only", action="store_true", help="Only rebuild states flagged needs_rebuild")
+    args = parser.parse_args()
+
+    await connect_to_mongo()
+    try:
+        stats = await rebuild_forecast_states(args.user_id, args.flagged_only)
+        print(f"✅ forecast_state rebuilt: {stats}")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
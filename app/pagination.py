@@ -0,0 +1,37 @@
+# app/pagination.py
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from bson import ObjectId
+
+
+def encode_cursor(sort_value: Optional[datetime], doc_id: ObjectId) -> str:
+    """Opaque continuation token for keyset pagination on (sort_value, _id)"""
+    payload = {"v": sort_value.isoformat() if sort_value is not None else None, "i": str(doc_id)}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Dict[str, Any]:
+    """Inverse of encode_cursor; raises ValueError for anything malformed"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        sort_value = datetime.fromisoformat(payload["v"]) if payload["v"] is not None else None
+        return {"value": sort_value, "id": ObjectId(payload["i"])}
+    except Exception as exc:
+        raise ValueError("Invalid pagination cursor") from exc
+
+
+def keyset_after(field: str, cursor: Dict[str, Any]) -> Dict[str, Any]:
+    """Filter for documents strictly after `cursor` when sorting by (field, _id) descending.
+    Documents missing `field` sort last in descending order, so they follow every dated one.
+    """
+    if cursor["value"] is None:
+        return {field: None, "_id": {"$lt": cursor["id"]}}
+    return {"$or": [
+        {field: {"$lt": cursor["value"]}},
+        {field: cursor["value"], "_id": {"$lt": cursor["id"]}},
+        {field: None},
+    ]}
@@ -1,10 +1,15 @@
 # app/routers/loans.py
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from typing import List
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Optional
 from datetime import datetime
-from app.database import db
-from app.models import LoanModel, LoanCreate, LoanRepayRequest, NotificationModel
-from app.scheduler import check_overdue_loans
+from bson import ObjectId
+from pymongo import ReturnDocument
+from app.database import db, mongo_datetime, utcnow_ms
+from app.models import LoanModel, LoanCreate, LoanRepayRequest, NotificationModel, NotificationMarkReadRequest
+from app.scheduler import run_overdue_sweep
+from app.notifications import notification_sink, get_unread_count, mark_read
+from app.pagination import decode_cursor, encode_cursor, keyset_after
+from app.serialization import json_list_response, projection_for
 
 router = APIRouter()
 
@@ -12,7 +17,8 @@ router = APIRouter()
 async def create_notification(user_id: str, loan_id: str, type_: str, message: str) -> None:
 	if db.client is None or db.database is None:
 		return
-	await db.database.notifications.insert_one({
+	# Buffered and written in batches; blocks only if the sink's queue is full
+	await notification_sink.enqueue({
 		"user_id": user_id,
 		"loan_id": loan_id,
 		"type": type_,
@@ -23,57 +29,55 @@ async def create_notification(user_id: str, loan_id: str, type_: str, message: s
 
 
 @router.post("/create_loan", response_model=LoanModel, status_code=201)
-async def create_loan(payload: LoanCreate, background_tasks: BackgroundTasks):
+async def create_loan(payload: LoanCreate):
 	if db.client is None or db.database is None:
 		raise HTTPException(status_code=500, detail="Database connection not available")
 	try:
 		loan_doc = payload.model_dump()
 		loan_doc["status"] = "pending"
-		loan_doc["created_at"] = datetime.utcnow()
+		loan_doc["due_date"] = mongo_datetime(loan_doc["due_date"])
+		loan_doc["created_at"] = utcnow_ms()
+		# insert_one fills in loan_doc["_id"]; no need to read the document back
 		result = await db.database.loans.insert_one(loan_doc)
-		created = await db.database.loans.find_one({"_id": result.inserted_id})
 
 		# Notify borrower and lender
-		background_tasks.add_task(
-			create_notification,
+		await create_notification(
 			user_id=payload.borrower_id,
 			loan_id=str(result.inserted_id),
 			type_="loan_created",
 			message=f"You received a loan of {payload.amount} due on {payload.due_date.isoformat()}"
 		)
-		background_tasks.add_task(
-			create_notification,
+		await create_notification(
 			user_id=payload.lender_id,
 			loan_id=str(result.inserted_id),
 			type_="loan_created",
 			message=f"You lent {payload.amount} to {payload.borrower_id} due on {payload.due_date.isoformat()}"
 		)
-		return LoanModel(**created)
+		return LoanModel(**loan_doc)
 	except Exception as e:
 		raise HTTPException(status_code=500, detail=f"Error creating loan: {str(e)}")
 
 
 @router.post("/repay_loan", response_model=LoanModel)
-async def repay_loan(payload: LoanRepayRequest, background_tasks: BackgroundTasks):
+async def repay_loan(payload: LoanRepayRequest):
 	if db.client is None or db.database is None:
 		raise HTTPException(status_code=500, detail="Database connection not available")
 	try:
-		from bson import ObjectId
-		loan = await db.database.loans.find_one({"_id": ObjectId(payload.loan_id)})
-		if not loan:
-			raise HTTPException(status_code=404, detail="Loan not found")
-		if loan.get("status") == "repaid":
-			raise HTTPException(status_code=400, detail="Loan already repaid")
-
-		await db.database.loans.update_one(
-			{"_id": loan["_id"]},
-			{"$set": {"status": "repaid", "repaid_at": datetime.utcnow()}}
+		loan_id = ObjectId(payload.loan_id)
+		# The status predicate makes the transition atomic: of two concurrent repays only one matches
+		updated = await db.database.loans.find_one_and_update(
+			{"_id": loan_id, "status": {"$ne": "repaid"}},
+			{"$set": {"status": "repaid", "repaid_at": datetime.utcnow()}},
+			return_document=ReturnDocument.AFTER,
 		)
-		updated = await db.database.loans.find_one({"_id": loan["_id"]})
+		if updated is None:
+			# Failure path only: tell a missing loan apart from one that is already repaid
+			if await db.database.loans.find_one({"_id": loan_id}, {"_id": 1}) is None:
+				raise HTTPException(status_code=404, detail="Loan not found")
+			raise HTTPException(status_code=400, detail="Loan already repaid")
 
 		# Notify lender that borrower repaid
-		background_tasks.add_task(
-			create_notification,
+		await create_notification(
 			user_id=updated["lender_id"],
 			loan_id=str(updated["_id"]),
 			type_="loan_repaid",
@@ -95,21 +99,65 @@ async def list_user_loans(user_id: str):
 			{"lender_id": user_id},
 			{"borrower_id": user_id}
 		]
-	}).to_list(200)
-	return [LoanModel(**doc) for doc in loans]
+	}, projection_for(LoanModel)).to_list(200)
+	return json_list_response(LoanModel, loans)
 
 
 @router.get("/notifications/{user_id}", response_model=List[NotificationModel])
-async def get_notifications(user_id: str):
+async def get_notifications(
+	user_id: str,
+	limit: int = Query(200, ge=1, le=500, description="Page size"),
+	cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+	unread_only: bool = Query(False, description="Only unread notifications"),
+):
+	"""Newest-first page of a user's notifications; X-Next-Cursor holds the next page token"""
+	if db.client is None or db.database is None:
+		raise HTTPException(status_code=500, detail="Database connection not available")
+	query = {"user_id": user_id}
+	if unread_only:
+		query["read"] = False
+	if cursor:
+		try:
+			query = {"$and": [query, keyset_after("created_at", decode_cursor(cursor))]}
+		except ValueError as e:
+			raise HTTPException(status_code=400, detail=str(e))
+	notifs = await db.database.notifications.find(query, projection_for(NotificationModel)).sort(
+		[("created_at", -1), ("_id", -1)]
+	).limit(limit + 1).to_list(limit + 1)
+	headers = {}
+	if len(notifs) > limit:
+		notifs = notifs[:limit]
+		headers["X-Next-Cursor"] = encode_cursor(notifs[-1].get("created_at"), notifs[-1]["_id"])
+	return json_list_response(NotificationModel, notifs, headers)
+
+
+@router.get("/notifications/{user_id}/unread_count")
+async def get_notifications_unread_count(user_id: str):
+	"""O(1) badge count read from the maintained per-user counter"""
+	if db.client is None or db.database is None:
+		raise HTTPException(status_code=500, detail="Database connection not available")
+	return {"user_id": user_id, "unread": await get_unread_count(user_id)}
+
+
+@router.post("/notifications/{user_id}/mark_read")
+async def mark_notifications_read(user_id: str, payload: NotificationMarkReadRequest):
 	if db.client is None or db.database is None:
 		raise HTTPException(status_code=500, detail="Database connection not available")
-	notifs = await db.database.notifications.find({"user_id": user_id}).sort("created_at", -1).to_list(200)
-	return [NotificationModel(**doc) for doc in notifs]
+	ids = None
+	if payload.ids is not None:
+		if not all(ObjectId.is_valid(value) for value in payload.ids):
+			raise HTTPException(status_code=400, detail="Invalid notification id")
+		ids = [ObjectId(value) for value in payload.ids]
+	marked = await mark_read(user_id, ids)
+	return {"user_id": user_id, "marked_read": marked, "unread": await get_unread_count(user_id)}
 
 
 @router.post("/loans/check_overdue")
 async def trigger_check_overdue():
 	if db.client is None or db.database is None:
 		raise HTTPException(status_code=500, detail="Database connection not available")
-	await check_overdue_loans()
-	return {"status": "ok"} 
\ No newline at end of file
+	# Takes the nightly job's leases (whole sweep or per shard), so a manual run never overlaps it
+	stats = await run_overdue_sweep(nightly=False)
+	if stats is None:
+		raise HTTPException(status_code=409, detail="Overdue sweep is already running")
+	return {"status": "ok", **stats} 
\ No newline at end of file
@@ -1,11 +1,26 @@
 # app/routers/predict.py
+import os
 from fastapi import APIRouter, HTTPException
-from typing import Dict, List, Any, Optional
-from app.ml_model import get_loaded_model, get_feature_order
+from functools import lru_cache
+from itertools import chain
+from operator import itemgetter
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.ml_model import ModelVersion, get_model_version, registry
+from app.inference_batcher import get_micro_batcher
+from app.inference_executor import run_inference
 from app.models import PredictRequest, PredictBatchRequest, PredictResponse
+from app.cache import TTLCache
 
 router = APIRouter()
 
+# Optional LRU of predictions keyed on (model name, version, feature vector); 0 disables it
+_prediction_cache = TTLCache(maxsize=int(os.getenv("PREDICT_CACHE_SIZE", "0")), ttl=None)
+# Version is part of the key already; clearing on swap just frees the stale entries
+registry.add_swap_listener(lambda mv: _prediction_cache.clear())
+
 
 def _row_from_features(feature_mapping: Dict[str, float], feature_order: Optional[List[str]]) -> List[float]:
 	if feature_order:
@@ -14,36 +29,129 @@ def _row_from_features(feature_mapping: Dict[str, float], feature_order: Optiona
 	return [float(value) for _, value in sorted(feature_mapping.items(), key=lambda kv: kv[0])]
 
 
-@router.post("/predict_spending", response_model=PredictResponse)
-async def predict_spending(payload: PredictRequest) -> Any:
-	model = get_loaded_model()
-	if model is None:
+@lru_cache(maxsize=32)
+def _feature_getter(feature_order: Tuple[str, ...]):
+	"""C-level getter pulling one row's values in feature order (always returns a tuple)"""
+	if len(feature_order) == 1:
+		getter = itemgetter(feature_order[0])
+		return lambda row: (getter(row),)
+	return itemgetter(*feature_order)
+
+
+def _matrix_from_rows(rows: Sequence[Dict[str, float]], feature_order: Sequence[str]) -> np.ndarray:
+	"""Build a float64 (n_rows, n_features) matrix without per-cell float() calls"""
+	n_rows, n_features = len(rows), len(feature_order)
+	if n_rows == 0 or n_features == 0:
+		return np.zeros((n_rows, n_features), dtype=np.float64)
+	getter = _feature_getter(tuple(feature_order))
+	try:
+		flat = np.fromiter(chain.from_iterable(map(getter, rows)), dtype=np.float64, count=n_rows * n_features)
+	except KeyError:
+		# Some rows omit features: those default to 0.0, as in _row_from_features
+		flat = np.fromiter(
+			(row.get(name, 0.0) for row in rows for name in feature_order),
+			dtype=np.float64, count=n_rows * n_features,
+		)
+	return flat.reshape(n_rows, n_features)
+
+
+def _matrix_from_columns(columns: Dict[str, List[float]], feature_order: Sequence[str]) -> np.ndarray:
+	"""Stack columnar input in feature order; missing features become zero columns"""
+	n_rows = len(next(iter(columns.values()), []))
+	matrix = np.zeros((n_rows, len(feature_order)), dtype=np.float64)
+	for index, name in enumerate(feature_order):
+		values = columns.get(name)
+		if values is not None:
+			matrix[:, index] = values
+	return matrix
+
+
+def _batch_matrix(payload: PredictBatchRequest, feature_order: Optional[List[str]]) -> np.ndarray:
+	if payload.columns is not None:
+		return _matrix_from_columns(payload.columns, feature_order or sorted(payload.columns))
+	if feature_order:
+		return _matrix_from_rows(payload.batch, feature_order)
+	# No explicit feature order: sorted union of keys, for deterministic behavior
+	return _matrix_from_rows(payload.batch, sorted(set().union(*payload.batch)))
+
+
+async def _predict_cached(mv: ModelVersion, matrix: np.ndarray) -> List[float]:
+	"""Answer rows seen before from the cache and send only the misses to the model"""
+	if _prediction_cache.maxsize <= 0:
+		return await run_inference(mv, matrix)
+	keys = [(mv.name, mv.version, row) for row in map(tuple, matrix.tolist())]
+	results: List[Optional[float]] = [_prediction_cache.get(key) for key in keys]
+	misses = [index for index, value in enumerate(results) if value is None]
+	if misses:
+		preds = await run_inference(mv, matrix[misses])
+		for index, value in zip(misses, preds):
+			results[index] = value
+			_prediction_cache.set(keys[index], value)
+	return results
+
+
+def _resolve_model(model_name: str, model_version: Optional[str]) -> ModelVersion:
+	mv = get_model_version(model_name, model_version)
+	if mv is None:
+		if model_version is not None:
+			raise HTTPException(status_code=404, detail=f"Model '{model_name}' version '{model_version}' is not loaded")
 		raise HTTPException(status_code=500, detail="Model not loaded")
+	return mv
 
-	feature_order = get_feature_order()
+
+@router.post("/predict_spending", response_model=PredictResponse)
+async def predict_spending(payload: PredictRequest) -> Any:
+	mv = _resolve_model(payload.model_name, payload.model_version)
+	feature_order = mv.feature_order
 	row = _row_from_features(payload.features, feature_order)
 
 	try:
-		pred = model.predict([row])
-		# Convert numpy types to native floats if needed
-		pred_floats = [float(x) for x in (pred.tolist() if hasattr(pred, "tolist") else pred)]
-		return PredictResponse(predictions=pred_floats, used_feature_order=feature_order)
+		key = (mv.name, mv.version, tuple(row))
+		cached = _prediction_cache.get(key) if _prediction_cache.maxsize > 0 else None
+		if cached is not None:
+			return PredictResponse(predictions=[cached], used_feature_order=feature_order, model_version=mv.version)
+		batcher = get_micro_batcher()
+		if batcher is not None:
+			# Coalesced with concurrent single-row requests into one predict()
+			pred = [await batcher.predict_one(mv, row)]
+		else:
+			pred = await run_inference(mv, [row])
+		_prediction_cache.set(key, pred[0])
+		return PredictResponse(predictions=pred, used_feature_order=feature_order, model_version=mv.version)
 	except Exception as exc:
 		raise HTTPException(status_code=500, detail=f"Prediction failed: {exc}")
 
 
 @router.post("/predict_spending_batch", response_model=PredictResponse)
 async def predict_spending_batch(payload: PredictBatchRequest) -> Any:
-	model = get_loaded_model()
-	if model is None:
-		raise HTTPException(status_code=500, detail="Model not loaded")
-
-	feature_order = get_feature_order()
-	matrix = [_row_from_features(item, feature_order) for item in payload.batch]
+	"""Batch prediction from either row mappings (`batch`) or columnar arrays (`columns`)"""
+	mv = _resolve_model(payload.model_name, payload.model_version)
+	feature_order = mv.feature_order
+	matrix = _batch_matrix(payload, feature_order)
 
 	try:
-		pred = model.predict(matrix)
-		pred_floats = [float(x) for x in (pred.tolist() if hasattr(pred, "tolist") else pred)]
-		return PredictResponse(predictions=pred_floats, used_feature_order=feature_order)
+		pred = await _predict_cached(mv, matrix)
+		return PredictResponse(predictions=pred, used_feature_order=feature_order, model_version=mv.version)
 	except Exception as exc:
-		raise HTTPException(status_code=500, detail=f"Prediction failed: {exc}") 
\ No newline at end of file
+		raise HTTPException(status_code=500, detail=f"Prediction failed: {exc}")
+
+
+@router.get("/predict_spending/batcher_stats")
+async def predict_batcher_stats() -> Any:
+	"""Batch-size and wait-time histograms of the single-row micro-batcher"""
+	batcher = get_micro_batcher()
+	if batcher is None:
+		return {"enabled": False}
+	return {"enabled": True, **batcher.stats()}
+
+
+@router.get("/predict_spending/cache_stats")
+async def predict_cache_stats() -> Any:
+	"""Hit ratio and size of the prediction cache (PREDICT_CACHE_SIZE=0 means disabled)"""
+	return {"enabled": _prediction_cache.maxsize > 0, **_prediction_cache.stats()}
+
+
+@router.get("/models")
+async def list_models() -> Any:
+	"""Loaded model versions with their load times and approximate memory footprint"""
+	return {"models": registry.describe()}
@@ -1,7 +1,12 @@
 # app/routers/savings.py
 from fastapi import APIRouter, HTTPException, Query
+from datetime import datetime
 from typing import Dict, Optional
-from app.smart_saving_agent import analyze_user_savings
+from app.smart_saving_agent import analyze_user_savings, get_snapshot_suggestions
+from app.llm_client import get_llm_client
+from app.savings_cache import savings_cache
+from app.scheduler import SCHEDULER_LOCK_TTL_SECONDS, build_savings_snapshots, get_savings_snapshot
+from app.leader_lock import run_exclusive
 
 router = APIRouter()
 
@@ -13,7 +18,7 @@ async def get_savings_analysis(
 ) -> Dict:
     """Get comprehensive savings analysis for a user"""
     try:
-        analysis = await analyze_user_savings(user_id, days)
+        analysis = await savings_cache.get_or_compute(user_id, days, lambda: analyze_user_savings(user_id, days))
         return analysis
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
@@ -24,9 +29,27 @@ async def get_savings_summary(
     user_id: str,
     days: int = Query(30, description="Number of days to analyze", ge=7, le=365)
 ) -> Dict:
-    """Get a simplified savings summary for quick insights"""
+    """Get a simplified savings summary for quick insights.
+    Served from the nightly snapshot when one covers `days`, otherwise computed
+    live; `freshness` says which and how old the numbers are.
+    """
     try:
-        full_analysis = await analyze_user_savings(user_id, days)
+        snapshot = await get_savings_snapshot(user_id, days)
+        if snapshot is not None:
+            return {
+                "user_id": user_id,
+                "analysis_period_days": days,
+                "total_spent": snapshot["total_spent"],
+                "average_daily_expense": snapshot["average_daily_expense"],
+                "max_daily_expense": snapshot["max_daily_expense"],
+                "min_daily_expense": snapshot["min_daily_expense"],
+                "ai_suggestions": await get_snapshot_suggestions(snapshot),
+                "analysis_date": snapshot["computed_at"].isoformat(),
+                "freshness": {"source": "snapshot", "age_seconds": snapshot["age_seconds"]},
+            }
+
+        full_analysis = await savings_cache.get_or_compute(user_id, days, lambda: analyze_user_savings(user_id, days))
+        analysis_date = full_analysis.get("analysis_date")
         
         # Extract key metrics for summary
         summary = {
@@ -37,9 +60,39 @@ async def get_savings_summary(
             "max_daily_expense": full_analysis.get("max_daily_expense", 0),
             "min_daily_expense": full_analysis.get("min_daily_expense", 0),
             "ai_suggestions": full_analysis.get("ai_suggestions", "No suggestions available"),
-            "analysis_date": full_analysis.get("analysis_date")
+            "analysis_date": analysis_date,
+            # Live results can still come from the short-lived savings cache
+            "freshness": {
+                "source": "live",
+                "age_seconds": round((datetime.utcnow() - datetime.fromisoformat(analysis_date)).total_seconds(), 1) if analysis_date else 0.0,
+            },
         }
         
         return summary
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Summary generation failed: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Summary generation failed: {str(e)}") 
+
+
+@router.post("/savings_snapshots/refresh")
+async def refresh_savings_snapshots() -> Dict:
+    """Run the nightly savings snapshot job now"""
+    try:
+        # Same lease as the nightly job, so a manual run never overlaps it
+        stats = await run_exclusive("build_savings_snapshots", build_savings_snapshots, ttl_seconds=SCHEDULER_LOCK_TTL_SECONDS)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Snapshot refresh failed: {str(e)}")
+    if stats is None:
+        raise HTTPException(status_code=409, detail="Savings snapshots are already being built")
+    return {"status": "ok", **stats}
+
+
+@router.get("/savings_llm_status")
+async def get_savings_llm_status() -> Dict:
+    """Call counters and circuit-breaker state of the LLM client used for suggestions"""
+    return get_llm_client().get_stats()
+
+
+@router.get("/savings_cache/stats")
+async def get_savings_cache_stats() -> Dict:
+    """Hit/miss counters for the per-user savings analysis cache"""
+    return savings_cache.stats()
@@ -1,8 +1,19 @@
 # app/routers/transactions.py
-from fastapi import APIRouter, Depends, HTTPException, Query
+import csv
+import io
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from bson import ObjectId
 from app.models import TransactionModel, TransactionCreate
-from app.database import db
-from typing import List
+from app.database import db, utcnow_ms
+from app.identity_cache import identity_cache
+from app.bulk_import import PARSERS, import_transactions, record_derived
+from app.savings_cache import savings_cache
+from app.pagination import decode_cursor, encode_cursor, keyset_after
+from app.serialization import json_list_response, projection_for
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Literal, Optional
 
 router = APIRouter()
 
@@ -13,30 +24,167 @@ async def create_transaction(transaction: TransactionCreate, user_id: str = Quer
         raise HTTPException(status_code=500, detail="Database connection not available")
     
     try:
-        # Verify user exists
-        user = await db.database.users.find_one({"$or": [{"clerk_user_id": user_id}, {"email": user_id}]})
+        # Verify user exists (served from the identity cache on repeat calls)
+        user = await identity_cache.resolve(user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
         transaction_dict = transaction.model_dump()
         transaction_dict["user_id"] = user_id
+        transaction_dict["date"] = utcnow_ms()
         
-        result = await db.database.transactions.insert_one(transaction_dict)
-        created_transaction = await db.database.transactions.find_one({"_id": result.inserted_id})
-        return TransactionModel(**created_transaction)
+        # insert_one fills in transaction_dict["_id"]; the response is built from it directly
+        await db.database.transactions.insert_one(transaction_dict)
+        # The transaction is stored: rollup or forecast failures are logged, not returned as a 500
+        await record_derived(user_id, [transaction_dict])
+        savings_cache.invalidate_user(user_id)
+        return TransactionModel(**transaction_dict)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating transaction: {str(e)}")
 
+_BULK_CONTENT_TYPES = {
+    "application/json": "json",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "text/csv": "csv",
+}
+
+
+@router.post("/bulk")
+async def bulk_import_transactions(
+    request: Request,
+    user_id: str = Query(..., description="User ID for every imported transaction"),
+    format: Optional[Literal["json", "ndjson", "csv"]] = Query(None, description="Body format; defaults to the Content-Type"),
+    chunk_size: int = Query(1000, ge=1, le=10000, description="Rows validated and written per insert_many"),
+):
+    """Import many transactions from a JSON array, NDJSON or CSV (with header) body.
+    The body is streamed and written in chunks; rows that fail validation or the
+    insert are listed in `errors` by 1-based row number and do not stop the import.
+    If the body breaks off, the rows read so far are still imported and `aborted` says where it stopped.
+    """
+    if db.client is None or db.database is None:
+        raise HTTPException(status_code=500, detail="Database connection not available")
+
+    fmt = format or _BULK_CONTENT_TYPES.get(request.headers.get("content-type", "").split(";")[0].strip().lower())
+    if fmt is None:
+        raise HTTPException(status_code=415, detail="Send JSON, NDJSON or CSV, or pass ?format=")
+    if await identity_cache.resolve(user_id) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    try:
+        report = await import_transactions(user_id, PARSERS[fmt](request.stream()), chunk_size)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error importing transactions: {str(e)}")
+    finally:
+        # Whatever made it in changes the user's savings analysis
+        savings_cache.invalidate_user(user_id)
+    return {"format": fmt, **report}
+
+
+def _transactions_query(user_id: str, start_date: Optional[datetime], end_date: Optional[datetime]) -> Dict:
+    query: Dict = {"user_id": user_id}
+    date_range = {}
+    if start_date is not None:
+        date_range["$gte"] = start_date
+    if end_date is not None:
+        date_range["$lte"] = end_date
+    if date_range:
+        query["date"] = date_range
+    return query
+
+
 @router.get("/user/{user_id}", response_model=List[TransactionModel])
-async def get_user_transactions(user_id: str):
-    """Get all transactions for a specific user"""
+async def get_user_transactions(
+    user_id: str,
+    limit: int = Query(100, ge=1, le=1000, description="Page size"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    start_date: Optional[datetime] = Query(None, description="Only transactions on/after this date"),
+    end_date: Optional[datetime] = Query(None, description="Only transactions on/before this date"),
+):
+    """Get a user's transactions, newest first, one page at a time.
+    When more results exist the X-Next-Cursor response header holds the token for the next page.
+    """
     if db.client is None or db.database is None:
         raise HTTPException(status_code=500, detail="Database connection not available")
     
+    query = _transactions_query(user_id, start_date, end_date)
+    if cursor:
+        try:
+            query = {"$and": [query, keyset_after("date", decode_cursor(cursor))]}
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
     try:
-        transactions = await db.database.transactions.find({"user_id": user_id}).to_list(100)
-        return [TransactionModel(**transaction) for transaction in transactions]
+        transactions = await db.database.transactions.find(query, projection_for(TransactionModel)).sort(
+            [("date", -1), ("_id", -1)]
+        ).limit(limit + 1).to_list(limit + 1)
+        headers = {}
+        if len(transactions) > limit:
+            transactions = transactions[:limit]
+            last = transactions[-1]
+            headers["X-Next-Cursor"] = encode_cursor(last.get("date"), last["_id"])
+        return json_list_response(TransactionModel, transactions, headers)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching transactions: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error fetching transactions: {str(e)}")
+
+
+_EXPORT_FIELDS = ["_id", "date", "amount", "category", "description", "transaction_type", "user_id"]
+
+
+def _export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    return value
+
+
+async def _export_rows(cursor, fmt: str, batch_size: int) -> AsyncIterator[str]:
+    """Yield the export one cursor batch at a time so memory stays flat"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == "csv" else None
+    if writer is not None:
+        writer.writerow(_EXPORT_FIELDS)
+    pending = 0
+    async for doc in cursor:
+        values = [_export_value(doc.get(field)) for field in _EXPORT_FIELDS]
+        if writer is not None:
+            writer.writerow(values)
+        else:
+            buffer.write(json.dumps(dict(zip(_EXPORT_FIELDS, values))))
+            buffer.write("\n")
+        pending += 1
+        if pending >= batch_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+@router.get("/user/{user_id}/export")
+async def export_user_transactions(
+    user_id: str,
+    format: Literal["ndjson", "csv"] = Query("ndjson", description="Export format"),
+    start_date: Optional[datetime] = Query(None, description="Only transactions on/after this date"),
+    end_date: Optional[datetime] = Query(None, description="Only transactions on/before this date"),
+):
+    """Stream a user's full transaction history as NDJSON or CSV, oldest first"""
+    if db.client is None or db.database is None:
+        raise HTTPException(status_code=500, detail="Database connection not available")
+    
+    batch_size = 1000
+    cursor = db.database.transactions.find(
+        _transactions_query(user_id, start_date, end_date),
+        {field: 1 for field in _EXPORT_FIELDS},
+    ).sort([("date", 1), ("_id", 1)]).batch_size(batch_size)
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _export_rows(cursor, format, batch_size),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="transactions-{user_id}.{format}"'},
+    )
@@ -1,7 +1,9 @@
 # app/routers/users.py
 from fastapi import APIRouter, Depends, HTTPException
 from app.models import UserModel, UserCreate
-from app.database import db
+from app.database import db, utcnow_ms
+from app.identity_cache import identity_cache
+from app.serialization import json_list_response, projection_for
 from typing import List
 
 router = APIRouter()
@@ -19,14 +21,22 @@ async def create_user(user: UserCreate):
             raise HTTPException(status_code=400, detail="User with this email already exists")
         
         user_dict = user.model_dump()
-        result = await db.database.users.insert_one(user_dict)
-        created_user = await db.database.users.find_one({"_id": result.inserted_id})
-        return UserModel(**created_user)
+        user_dict["created_at"] = utcnow_ms()
+        # insert_one fills in user_dict["_id"]; the response is built from it directly
+        await db.database.users.insert_one(user_dict)
+        # Replaces any "not found" entry cached for this email or clerk id
+        identity_cache.remember(user_dict)
+        return UserModel(**user_dict)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating user: {str(e)}")
 
+@router.get("/identity_cache/stats")
+async def get_identity_cache_stats():
+    """Hit/miss counters for the identifier -> user cache used on transaction writes"""
+    return identity_cache.stats()
+
 @router.get("/{user_id}", response_model=UserModel)
 async def get_user(user_id: str):
     """Get user by ID"""
@@ -57,7 +67,7 @@ async def get_all_users():
         raise HTTPException(status_code=500, detail="Database connection not available")
     
     try:
-        users = await db.database.users.find().to_list(100)  # Limit to 100 users
-        return [UserModel(**user) for user in users]
+        users = await db.database.users.find({}, projection_for(UserModel)).to_list(100)  # Limit to 100 users
+        return json_list_response(UserModel, users)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching users: {str(e)}")
\ No newline at end of file
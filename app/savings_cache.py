@@ -0,0 +1,59 @@
+# app/savings_cache.py
+import os
+from typing import Awaitable, Callable, Dict
+
+from app.cache import TTLCache
+
+
+class SavingsAnalysisCache:
+    """Caches analyze_user_savings results keyed by (user_id, days).
+    Writes for a user drop that user's cached entries and, while analyses for
+    the user are running, bump its generation so they do not store a stale
+    result. Generations are only kept for users with an analysis in flight.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._generations: Dict[str, int] = {}
+        self._in_flight: Dict[str, int] = {}
+        self.invalidations = 0
+
+    async def get_or_compute(self, user_id: str, days: int, compute: Callable[[], Awaitable[Dict]]) -> Dict:
+        key = (user_id, days)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        self._in_flight[user_id] = self._in_flight.get(user_id, 0) + 1
+        generation = self._generations.get(user_id, 0)
+        try:
+            result = await compute()
+        finally:
+            stale = self._generations.get(user_id, 0) != generation
+            remaining = self._in_flight.pop(user_id) - 1
+            if remaining:
+                self._in_flight[user_id] = remaining
+            else:
+                self._generations.pop(user_id, None)
+        # Failed analyses are returned but never cached
+        if "error" not in result and not stale:
+            self._cache.set(key, result)
+        return result
+
+    def invalidate_user(self, user_id: str) -> None:
+        if user_id in self._in_flight:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+        for key in [k for k in self._cache.keys() if k[0] == user_id]:
+            self._cache.pop(key)
+        self.invalidations += 1
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> Dict:
+        return {**self._cache.stats(), "invalidations": self.invalidations}
+
+
+savings_cache = SavingsAnalysisCache(
+    maxsize=int(os.getenv("SAVINGS_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("SAVINGS_CACHE_TTL_SECONDS", "300")),
+)
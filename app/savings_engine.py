@@ -0,0 +1,130 @@
+# app/savings_engine.py
+"""NumPy implementation of the savings analysis math: EWMA, linear trend and
+forecast. The 1-D functions serve one user's series in analyze_user_savings;
+the *_rows variants do the same for many users at once over a users x days
+matrix where each row holds one user's daily totals oldest first, left-aligned
+and padded with NaN.
+"""
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+
+_ONE_DAY = np.timedelta64(1, "D")
+
+
+def _ewma_weights(span: int) -> Tuple[float, float]:
+    # Derived exactly as pandas does (span -> com -> alpha) so results match bit for bit
+    com = (span - 1) / 2.0
+    alpha = 1.0 / (1.0 + com)
+    return 1.0 - alpha, alpha
+
+
+def ewma(values: Sequence[float], span: int = 7) -> np.ndarray:
+    """pandas Series.ewm(span=span, adjust=False).mean() for a gap-free series.
+    Same recurrence and operation order as pandas' ewm kernel, including
+    leaving the average untouched when it already equals the new value.
+    """
+    old_wt, new_wt = _ewma_weights(span)
+    total_wt = old_wt + new_wt
+    xs = np.asarray(values, dtype=np.float64).tolist()
+    out = []
+    weighted = xs[0] if xs else 0.0
+    for cur in xs:
+        if weighted != cur:
+            weighted = (old_wt * weighted + new_wt * cur) / total_wt
+        out.append(weighted)
+    return np.array(out, dtype=np.float64)
+
+
+def linear_trend(values: Sequence[float]) -> Tuple[float, float]:
+    """(slope, intercept) of the least-squares line through values against
+    their index, in closed form; np.polyfit(index, values, 1) solves the same
+    problem through an SVD. Needs at least two points.
+    """
+    y = np.asarray(values, dtype=np.float64)
+    n = len(y)
+    x_mean = (n - 1) / 2.0
+    dx = np.arange(n, dtype=np.float64) - x_mean
+    slope = float(dx @ (y - y.mean()) / (dx @ dx))
+    return slope, float(y.mean() - slope * x_mean)
+
+
+def forecast(dates: np.ndarray, values: Sequence[float], horizon: int = 7) -> Tuple[np.ndarray, np.ndarray]:
+    """Extend the linear trend `horizon` days past the last date.
+    Returns (dates, forecast values); both empty with fewer than two points.
+    """
+    n = len(values)
+    if n < 2:
+        return np.array([], dtype=dates.dtype), np.array([], dtype=np.float64)
+    slope, intercept = linear_trend(values)
+    steps = np.arange(1, horizon + 1)
+    return dates[-1] + steps * _ONE_DAY, slope * (n - 1 + steps).astype(np.float64) + intercept
+
+
+def pack_rows(series: Sequence[Sequence[float]]) -> np.ndarray:
+    """Left-align variable-length series into a NaN-padded float matrix"""
+    width = max((len(values) for values in series), default=0)
+    matrix = np.full((len(series), width), np.nan)
+    for i, values in enumerate(series):
+        matrix[i, :len(values)] = values
+    return matrix
+
+
+def ewma_rows(values: np.ndarray, span: int = 7) -> np.ndarray:
+    """Row-wise ewma(): loops over days and is vectorised over users; padding stays NaN"""
+    old_wt, new_wt = _ewma_weights(span)
+    total_wt = old_wt + new_wt
+    out = np.full(values.shape, np.nan)
+    if values.shape[1] == 0:
+        return out
+    current = values[:, 0].copy()
+    out[:, 0] = current
+    for t in range(1, values.shape[1]):
+        column = values[:, t]
+        update = ~np.isnan(column) & (current != column)
+        current = np.where(update, (old_wt * current + new_wt * column) / total_wt, current)
+        valid = ~np.isnan(column)
+        out[valid, t] = current[valid]
+    return out
+
+
+def linear_trend_rows(values: np.ndarray) -> Dict[str, np.ndarray]:
+    """Closed-form least-squares line through each row against its day index
+    (what np.polyfit(day, expense, 1) computes). Rows with fewer than two
+    points get NaN slope and intercept.
+    """
+    mask = ~np.isnan(values)
+    n = mask.sum(axis=1).astype(float)
+    x = np.where(mask, np.arange(values.shape[1], dtype=float), 0.0)
+    y = np.where(mask, values, 0.0)
+    sx, sy = x.sum(axis=1), y.sum(axis=1)
+    sxx, sxy = (x * x).sum(axis=1), (x * y).sum(axis=1)
+    denom = n * sxx - sx * sx
+    fit = (n >= 2) & (denom > 0)
+    slope = np.divide(n * sxy - sx * sy, denom, out=np.full(n.shape, np.nan), where=fit)
+    intercept = np.divide(sy - slope * sx, n, out=np.full(n.shape, np.nan), where=fit)
+    return {"n": n, "slope": slope, "intercept": intercept}
+
+
+def summarize_rows(values: np.ndarray, span: int = 7, horizon: int = 7) -> Dict[str, np.ndarray]:
+    """Everything a savings summary needs, one array entry (or row) per user.
+    `forecast` is users x horizon: the trend line extended past each user's last day.
+    """
+    counts = (~np.isnan(values)).sum(axis=1)
+    has_data = counts > 0
+    total = np.nansum(values, axis=1)
+    filled_max = np.where(np.isnan(values), -np.inf, values).max(axis=1, initial=-np.inf)
+    filled_min = np.where(np.isnan(values), np.inf, values).min(axis=1, initial=np.inf)
+    ewma = ewma_rows(values, span)
+    trend = linear_trend_rows(values)
+    steps = (trend["n"] - 1.0)[:, None] + np.arange(1, horizon + 1, dtype=float)[None, :]
+    return {
+        "count": counts,
+        "total": total,
+        "mean": np.divide(total, counts, out=np.zeros(total.shape), where=has_data),
+        "max": np.where(has_data, filled_max, 0.0),
+        "min": np.where(has_data, filled_min, 0.0),
+        "last_ewma": ewma[np.arange(len(values)), np.maximum(counts - 1, 0)] if values.shape[1] else np.full(len(values), np.nan),
+        "slope": trend["slope"],
+        "forecast": trend["intercept"][:, None] + trend["slope"][:, None] * steps,
+    }
@@ -1,45 +1,267 @@
 # app/scheduler.py
-from datetime import datetime
-from typing import Optional
+import math
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from pymongo import ReplaceOne
 
 from app.database import db
+from app.leader_lock import claim_shards, run_exclusive
+from app.notifications import notification_sink
+from app.online_forecast import get_state_forecasts
+from app.savings_engine import pack_rows, summarize_rows
+from app.smart_saving_agent import FORECAST_MODEL
+from app.spend_rollup import day_start
 
 scheduler: Optional[AsyncIOScheduler] = None
 
+# Loans handled per bulk round trip in the overdue sweep
+OVERDUE_SWEEP_BATCH_SIZE = int(os.getenv("OVERDUE_SWEEP_BATCH_SIZE", "1000"))
 
-async def check_overdue_loans() -> None:
+# Lease length for the scheduler_locks leader lock; renewed every third of it while a job runs
+SCHEDULER_LOCK_TTL_SECONDS = float(os.getenv("SCHEDULER_LOCK_TTL_SECONDS", "120"))
+# Split the overdue sweep into due-date shards that workers claim in parallel (1 = one worker runs it all)
+OVERDUE_SWEEP_SHARDS = int(os.getenv("OVERDUE_SWEEP_SHARDS", "1"))
+# Width of each due-date shard; the oldest shard takes everything before the others
+OVERDUE_SWEEP_SHARD_DAYS = int(os.getenv("OVERDUE_SWEEP_SHARD_DAYS", "7"))
+
+# Window covered by the nightly savings snapshots; summaries for other windows are computed live
+SAVINGS_SNAPSHOT_DAYS = int(os.getenv("SAVINGS_SNAPSHOT_DAYS", "30"))
+# Users per users x days matrix (bounds memory for the vectorised pass)
+SAVINGS_SNAPSHOT_BATCH_SIZE = int(os.getenv("SAVINGS_SNAPSHOT_BATCH_SIZE", "5000"))
+# Snapshots older than this are ignored and the summary is computed live
+SAVINGS_SNAPSHOT_MAX_AGE_HOURS = float(os.getenv("SAVINGS_SNAPSHOT_MAX_AGE_HOURS", "36"))
+
+
+async def check_overdue_loans(
+	batch_size: Optional[int] = None,
+	due_after: Optional[datetime] = None,
+	due_before: Optional[datetime] = None,
+) -> Dict:
+	"""Mark due loans overdue and notify borrowers, one batch at a time.
+	Notifications are upserted on a per-loan dedupe key before the loans are
+	flipped, so re-running after a crash never double-notifies or loses one.
+	due_after/due_before restrict the sweep to one due-date shard.
+	"""
+	started = time.perf_counter()
+	stats = {"scanned": 0, "marked_overdue": 0, "notifications_created": 0, "batches": 0}
 	if db.client is None or db.database is None:
-		return
-	now = datetime.utcnow()
+		return {**stats, "duration_ms": 0.0}
+	batch_size = batch_size or OVERDUE_SWEEP_BATCH_SIZE
+	due_date = {"$lt": due_before or datetime.utcnow()}
+	if due_after is not None:
+		due_date["$gte"] = due_after
 	# Find loans with due_date < now and status not repaid/overdue
-	cursor = db.database.loans.find({
-		"due_date": {"$lt": now},
-		"status": {"$nin": ["repaid", "overdue"]},
-	})
+	cursor = db.database.loans.find(
+		{
+			"due_date": due_date,
+			"status": {"$nin": ["repaid", "overdue"]},
+		},
+		{"borrower_id": 1, "amount": 1, "due_date": 1},
+	).batch_size(batch_size)
+
+	batch: List[Dict] = []
 	async for loan in cursor:
-		# Mark overdue
-		await db.database.loans.update_one({"_id": loan["_id"]}, {"$set": {"status": "overdue"}})
-		# Notify borrower
-		await db.database.notifications.insert_one({
+		batch.append(loan)
+		if len(batch) >= batch_size:
+			await _mark_overdue_batch(batch, stats)
+			batch = []
+	if batch:
+		await _mark_overdue_batch(batch, stats)
+
+	stats["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+	print(f"🕒 Overdue loan sweep: {stats}")
+	return stats
+
+
+async def _mark_overdue_batch(loans: List[Dict], stats: Dict) -> None:
+	created_at = datetime.utcnow()
+	# Written through the sink's acknowledged path: loans must not flip before their notifications exist
+	created = await notification_sink.write_batch([
+		{
+			"dedupe_key": f"loan_overdue:{loan['_id']}",
 			"user_id": loan["borrower_id"],
 			"loan_id": str(loan["_id"]),
 			"type": "loan_overdue",
 			"message": f"Loan of {loan['amount']} is overdue. Due date was {loan['due_date'].isoformat()}.",
-			"created_at": datetime.utcnow(),
+			"created_at": created_at,
 			"read": False,
-		})
+		}
+		for loan in loans
+	])
+	updated = await db.database.loans.update_many(
+		{"_id": {"$in": [loan["_id"] for loan in loans]}, "status": {"$nin": ["repaid", "overdue"]}},
+		{"$set": {"status": "overdue"}},
+	)
+	stats["scanned"] += len(loans)
+	stats["batches"] += 1
+	stats["notifications_created"] += created
+	stats["marked_overdue"] += updated.modified_count
+
+
+async def build_savings_snapshots(days: Optional[int] = None, batch_size: Optional[int] = None) -> Dict:
+	"""Precompute the savings summary of every user with spending in the window.
+	Daily totals come from one aggregation over daily_spend; EWMA and trend are
+	computed for a whole batch of users at once with NumPy, and the forecast
+	uses the same model as the live analysis. Users with no spending in the
+	window lose their snapshot and are served live.
+	"""
+	started = time.perf_counter()
+	stats = {"users": 0, "batches": 0, "removed": 0}
+	if db.client is None or db.database is None:
+		return {**stats, "duration_ms": 0.0}
+	days = days or SAVINGS_SNAPSHOT_DAYS
+	batch_size = batch_size or SAVINGS_SNAPSHOT_BATCH_SIZE
+	run_started = datetime.utcnow()
+	start_date = run_started - timedelta(days=days)
+	# The sort walks the (user_id, day) index, so $push receives each user's days in order
+	cursor = db.database.daily_spend.aggregate([
+		{"$match": {"day": {"$gt": day_start(start_date), "$lte": run_started}}},
+		{"$sort": {"user_id": 1, "day": 1}},
+		{"$group": {
+			"_id": "$user_id",
+			"days": {"$push": "$day"},
+			"totals": {"$push": "$total"},
+			"categories": {"$push": {"$ifNull": ["$categories", {}]}},
+		}},
+	], allowDiskUse=True)
+
+	batch: List[Dict] = []
+	async for row in cursor:
+		batch.append(row)
+		if len(batch) >= batch_size:
+			await _write_snapshot_batch(batch, days, stats)
+			batch = []
+	if batch:
+		await _write_snapshot_batch(batch, days, stats)
+	removed = await db.database.savings_snapshots.delete_many({"computed_at": {"$lt": run_started}})
+	stats["removed"] = removed.deleted_count
+
+	stats["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+	print(f"🕒 Savings snapshots: {stats}")
+	return stats
+
+
+async def _write_snapshot_batch(rows: List[Dict], days: int, stats: Dict) -> None:
+	summary = summarize_rows(pack_rows([row["totals"] for row in rows]))
+	# Same forecast as the live analysis: the Holt-Winters state when enabled, else the linear trend
+	state_forecasts = await get_state_forecasts([row["_id"] for row in rows]) if FORECAST_MODEL == "holt_winters" else {}
+	computed_at = datetime.utcnow()
+	ops = []
+	for i, row in enumerate(rows):
+		slope = float(summary["slope"][i])
+		if row["_id"] in state_forecasts:
+			forecast_model = "holt_winters"
+			dates, values = state_forecasts[row["_id"]]
+			forecast = [
+				{"date": date, "forecast_expense": float(value)}
+				for date, value in zip(dates.astype("datetime64[us]").tolist(), values)
+			]
+		else:
+			forecast_model = "linear"
+			# Same rule as app.savings_engine.forecast: fewer than two days of data means no forecast
+			forecast = [] if math.isnan(slope) else [
+				{"date": row["days"][-1] + timedelta(days=k + 1), "forecast_expense": float(value)}
+				for k, value in enumerate(summary["forecast"][i])
+			]
+		total, mean = float(summary["total"][i]), float(summary["mean"][i])
+		max_daily, min_daily = float(summary["max"][i]), float(summary["min"][i])
+		ops.append(ReplaceOne({"_id": row["_id"]}, {
+			"user_id": row["_id"],
+			"analysis_period_days": days,
+			"days_with_data": int(summary["count"][i]),
+			"total_spent": total,
+			"average_daily_expense": mean,
+			"max_daily_expense": max_daily,
+			"min_daily_expense": min_daily,
+			"ewma": float(summary["last_ewma"][i]),
+			"trend_slope": None if math.isnan(slope) else slope,
+			"forecast": forecast,
+			"forecast_model": forecast_model,
+			# No LLM call per user at night: the summary asks for suggestions from these days on request
+			"daily": {"date": row["days"], "expense": row["totals"], "categories": row["categories"]},
+			"computed_at": computed_at,
+		}, upsert=True))
+	await db.database.savings_snapshots.bulk_write(ops, ordered=False)
+	stats["users"] += len(rows)
+	stats["batches"] += 1
+
+
+async def get_savings_snapshot(user_id: str, days: int) -> Optional[Dict]:
+	"""The user's precomputed summary, or None when there is no usable snapshot"""
+	if days != SAVINGS_SNAPSHOT_DAYS or db.client is None or db.database is None:
+		return None
+	snapshot = await db.database.savings_snapshots.find_one({"_id": user_id})
+	# Snapshots without their daily series predate on-request suggestions
+	if snapshot is None or snapshot.get("analysis_period_days") != days or "daily" not in snapshot:
+		return None
+	age = (datetime.utcnow() - snapshot["computed_at"]).total_seconds()
+	if age > SAVINGS_SNAPSHOT_MAX_AGE_HOURS * 3600:
+		return None
+	snapshot["age_seconds"] = round(age, 1)
+	return snapshot
+
+
+# ========== Leader-locked jobs (one worker runs each) ==========
+def _daily_run_id() -> str:
+	return day_start(datetime.utcnow()).strftime("%Y-%m-%d")
+
+
+def overdue_sweep_shards(run_day: datetime, shards: int, shard_days: int) -> List[Tuple[str, Optional[datetime], Optional[datetime]]]:
+	"""(name, due_after, due_before) for each shard, newest first. Older
+	boundaries only depend on the run day, so every worker computes the same
+	shards; the newest shard has no upper bound and, like the unsharded sweep,
+	runs up to the current time.
+	"""
+	bounds = [run_day - timedelta(days=i * shard_days) for i in range(shards)]
+	return [
+		(f"{i}", bounds[i + 1] if i + 1 < shards else None, bounds[i] if i > 0 else None)
+		for i in range(shards)
+	]
+
+
+async def run_overdue_sweep(nightly: bool = True) -> Optional[Dict]:
+	"""check_overdue_loans under the leader lock; with OVERDUE_SWEEP_SHARDS > 1
+	each due-date shard is a separate lease so several workers share the sweep.
+	The nightly run is done once per day; a manual run (nightly=False) takes the
+	same leases, so it never overlaps the nightly one, but is not tied to a day.
+	Returns None when the unsharded sweep is already running elsewhere.
+	"""
+	run_id = _daily_run_id() if nightly else None
+	if OVERDUE_SWEEP_SHARDS <= 1:
+		return await run_exclusive("check_overdue_loans", check_overdue_loans, run_id=run_id, ttl_seconds=SCHEDULER_LOCK_TTL_SECONDS)
+	shards = {
+		name: (due_after, due_before)
+		for name, due_after, due_before in overdue_sweep_shards(day_start(datetime.utcnow()), OVERDUE_SWEEP_SHARDS, OVERDUE_SWEEP_SHARD_DAYS)
+	}
+	totals = {"shards": 0, "scanned": 0, "marked_overdue": 0, "notifications_created": 0}
+	async for name in claim_shards("check_overdue_loans", shards, run_id, ttl_seconds=SCHEDULER_LOCK_TTL_SECONDS):
+		due_after, due_before = shards[name]
+		stats = await check_overdue_loans(due_after=due_after, due_before=due_before)
+		totals["shards"] += 1
+		for key in ("scanned", "marked_overdue", "notifications_created"):
+			totals[key] += stats[key]
+	return totals
+
+
+async def run_savings_snapshots() -> Optional[Dict]:
+	return await run_exclusive("build_savings_snapshots", build_savings_snapshots, run_id=_daily_run_id(), ttl_seconds=SCHEDULER_LOCK_TTL_SECONDS)
 
 
 def start_scheduler() -> None:
 	global scheduler
 	scheduler = AsyncIOScheduler()
 	# Run nightly at midnight UTC
-	scheduler.add_job(check_overdue_loans, CronTrigger(hour=0, minute=0))
+	# Every worker runs a scheduler; the scheduler_locks lease lets one of them run each job
+	scheduler.add_job(run_overdue_sweep, CronTrigger(hour=0, minute=0))
+	# Savings snapshots after the day's rollup is complete
+	scheduler.add_job(run_savings_snapshots, CronTrigger(hour=int(os.getenv("SAVINGS_SNAPSHOT_HOUR", "1")), minute=0))
 	scheduler.start()
-	print("🕒 APScheduler started: nightly overdue loan checks enabled")
+	print("🕒 APScheduler started: nightly overdue loan checks and savings snapshots enabled")
 
 
 def shutdown_scheduler() -> None:
@@ -0,0 +1,34 @@
+# app/serialization.py
+from functools import lru_cache
+from typing import Dict, List, Mapping, Optional, Type
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    # Building the validator/serializer is the expensive part; do it once per model
+    return TypeAdapter(List[model])
+
+
+@lru_cache(maxsize=None)
+def _projection(model: Type[BaseModel]) -> Dict[str, int]:
+    return {(field.alias or name): 1 for name, field in model.model_fields.items()}
+
+
+def projection_for(model: Type[BaseModel]) -> Dict[str, int]:
+    """Mongo projection that fetches only the fields `model` exposes"""
+    return dict(_projection(model))
+
+
+def json_list_response(model: Type[BaseModel], docs: List[Dict], headers: Optional[Mapping[str, str]] = None) -> Response:
+    """Validate raw Mongo documents against `model` once and encode them to JSON
+    in pydantic-core, bypassing FastAPI's second response_model validation and
+    jsonable_encoder walk. The output matches what response_model would produce.
+    ObjectIds are left for validate_id: its ObjectId branch is a bare str(),
+    while pre-stringified ids would be re-parsed to normalise them.
+    """
+    adapter = _list_adapter(model)
+    items = adapter.validate_python(docs)
+    return Response(content=adapter.dump_json(items, by_alias=True), media_type="application/json", headers=headers)
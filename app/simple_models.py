@@ -1,7 +1,20 @@
 # app/simple_models.py
-from typing import List, Sequence
+import json
+import os
+import struct
+from typing import List, Optional, Sequence
 import numpy as np
 
+# On-disk layout of a LinearSumModel (.lsm):
+#   8 bytes  magic
+#   4 bytes  little-endian uint32 header length
+#   header   UTF-8 JSON {"format_version", "features", "n_weights", "dtype"}, space-padded
+#            so the data starts on a 64-byte boundary
+#   data     n_weights + 1 little-endian float64 values: weights..., intercept
+LSM_MAGIC = b"\x93LSMODEL"
+LSM_FORMAT_VERSION = 1
+_LSM_ALIGN = 64
+
 
 class LinearSumModel:
 	"""Minimal linear regression-like model for inference only.
@@ -11,7 +24,64 @@ class LinearSumModel:
 	def __init__(self, weights: Sequence[float], intercept: float = 0.0):
 		self.weights = np.asarray(list(weights), dtype=float)
 		self.intercept = float(intercept)
+		self.feature_order: Optional[List[str]] = None
 
 	def predict(self, X):
 		X_arr = np.asarray(X, dtype=float)
-		return (X_arr @ self.weights + self.intercept).tolist() 
\ No newline at end of file
+		return (X_arr @ self.weights + self.intercept).tolist()
+
+	def save(self, path: str, features: Sequence[str]) -> None:
+		"""Write the pickle-free .lsm format. The file is replaced atomically so
+		processes that still have the previous version memory-mapped are unaffected.
+		"""
+		header = json.dumps({
+			"format_version": LSM_FORMAT_VERSION,
+			"features": list(features),
+			"n_weights": int(self.weights.shape[0]),
+			"dtype": "<f8",
+		}).encode("utf-8")
+		prefix = len(LSM_MAGIC) + 4
+		header += b" " * (-(prefix + len(header)) % _LSM_ALIGN)
+		data = np.concatenate([self.weights, [self.intercept]]).astype("<f8")
+
+		tmp_path = f"{path}.tmp-{os.getpid()}"
+		with open(tmp_path, "wb") as f:
+			f.write(LSM_MAGIC)
+			f.write(struct.pack("<I", len(header)))
+			f.write(header)
+			f.write(data.tobytes())
+		os.replace(tmp_path, path)
+
+	@classmethod
+	def load(cls, path: str) -> "LinearSumModel":
+		"""Memory-map an .lsm file. Weights are a read-only view of the page cache,
+		so every worker process loading the same file shares one physical copy.
+		"""
+		with open(path, "rb") as f:
+			if f.read(len(LSM_MAGIC)) != LSM_MAGIC:
+				raise ValueError(f"{path} is not a LinearSumModel file")
+			(header_len,) = struct.unpack("<I", f.read(4))
+			header = json.loads(f.read(header_len))
+		if header.get("format_version") != LSM_FORMAT_VERSION:
+			raise ValueError(f"Unsupported LinearSumModel format version {header.get('format_version')}")
+		n_weights = int(header["n_weights"])
+		data = np.memmap(path, dtype=header["dtype"], mode="r", offset=len(LSM_MAGIC) + 4 + header_len, shape=(n_weights + 1,))
+
+		model = cls.__new__(cls)
+		model.weights = np.asarray(data[:n_weights])
+		model.intercept = float(data[n_weights])
+		model.feature_order = [str(name) for name in header["features"]] or None
+		return model
+
+	def __setstate__(self, state):
+		# Pickles written before feature_order existed
+		state.setdefault("feature_order", None)
+		self.__dict__.update(state)
+
+
+def is_lsm_file(path: str) -> bool:
+	try:
+		with open(path, "rb") as f:
+			return f.read(len(LSM_MAGIC)) == LSM_MAGIC
+	except OSError:
+		return False
@@ -0,0 +1,149 @@
+# app/spend_rollup.py
+import argparse
+import asyncio
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from pymongo import ReplaceOne, UpdateOne
+
+from app.database import db
+
+# One document per (user_id, day):
+#   {user_id, day, total, count, categories: {category: amount}, updated_at}
+
+
+def day_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, value.day)
+
+
+def category_key(category) -> str:
+    """Category names become sub-document keys, so '.' and a leading '$' are not allowed"""
+    key = str(category if category is not None else "unknown").replace(".", "_")
+    return "_" + key[1:] if key.startswith("$") else key or "unknown"
+
+
+async def record_expenses(user_id: str, transactions: Iterable[Dict]) -> None:
+    """Fold newly inserted transactions into the rollup with atomic $inc upserts.
+    Income rows are ignored; several expenses on the same day become one update.
+    """
+    if db.client is None or db.database is None:
+        return
+    increments: Dict[datetime, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    for tx in transactions:
+        if tx.get("transaction_type") != "expense":
+            continue
+        inc = increments[day_start(tx.get("date") or datetime.utcnow())]
+        inc["total"] += tx["amount"]
+        inc["count"] = int(inc["count"]) + 1
+        inc["categories." + category_key(tx.get("category"))] += tx["amount"]
+    if not increments:
+        return
+    now = datetime.utcnow()
+    await db.database.daily_spend.bulk_write([
+        UpdateOne(
+            {"user_id": user_id, "day": day},
+            {"$inc": dict(inc), "$set": {"updated_at": now}},
+            upsert=True,
+        )
+        for day, inc in increments.items()
+    ], ordered=False)
+
+
+async def fetch_daily_spend(user_id: str, start_date: datetime, end_date: datetime) -> List[Dict]:
+    """Daily totals for the calendar days after start_date up to end_date, oldest first"""
+    if db.client is None or db.database is None:
+        raise ValueError("Database connection not available")
+    cursor = db.database.daily_spend.find(
+        {"user_id": user_id, "day": {"$gt": day_start(start_date), "$lte": end_date}},
+        {"_id": 0, "day": 1, "total": 1, "categories": 1},
+    ).sort("day", 1)
+    return [
+        {"date": doc["day"], "expense": doc["total"], "categories": doc.get("categories", {})}
+        async for doc in cursor
+    ]
+
+
+async def rebuild_daily_spend(user_id: Optional[str] = None, batch_size: int = 1000) -> Dict:
+    """Recompute the rollup from raw transactions (backfill or drift repair).
+    Days are replaced in place and days that no longer have expenses are
+    removed. Best run while writes are quiet: an $inc that lands between the
+    aggregation read and the replace of the same day is overwritten.
+    """
+    if db.client is None or db.database is None:
+        raise ValueError("Database connection not available")
+    started = datetime.utcnow()
+    match: Dict = {"transaction_type": "expense", "date": {"$type": "date"}}
+    if user_id is not None:
+        match["user_id"] = user_id
+    pipeline = [
+        {"$match": match},
+        {"$group": {
+            "_id": {
+                "user_id": "$user_id",
+                "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$date"}},
+                "category": {"$ifNull": ["$category", "unknown"]},
+            },
+            "amount": {"$sum": "$amount"},
+            "count": {"$sum": 1},
+        }},
+        {"$group": {
+            "_id": {"user_id": "$_id.user_id", "day": "$_id.day"},
+            "total": {"$sum": "$amount"},
+            "count": {"$sum": "$count"},
+            "categories": {"$push": {"category": "$_id.category", "amount": "$amount"}},
+        }},
+    ]
+
+    ops: List[ReplaceOne] = []
+    days_written = 0
+    async for row in db.database.transactions.aggregate(pipeline, allowDiskUse=True):
+        day = datetime.strptime(row["_id"]["day"], "%Y-%m-%d")
+        categories: Dict[str, float] = defaultdict(float)
+        for entry in row["categories"]:
+            categories[category_key(entry["category"])] += entry["amount"]
+        key = {"user_id": row["_id"]["user_id"], "day": day}
+        ops.append(ReplaceOne(key, {
+            **key,
+            "total": row["total"],
+            "count": row["count"],
+            "categories": dict(categories),
+            "updated_at": datetime.utcnow(),
+        }, upsert=True))
+        if len(ops) >= batch_size:
+            await db.database.daily_spend.bulk_write(ops, ordered=False)
+            days_written += len(ops)
+            ops = []
+    if ops:
+        await db.database.daily_spend.bulk_write(ops, ordered=False)
+        days_written += len(ops)
+
+    stale_filter: Dict = {"updated_at": {"$lt": started}}
+    if user_id is not None:
+        stale_filter["user_id"] = user_id
+    removed = await db.database.daily_spend.delete_many(stale_filter)
+    return {
+        "days_written": days_written,
+        "stale_days_removed": removed.deleted_count,
+        "duration_seconds": round((datetime.utcnow() - started).total_seconds(), 3),
+    }
+
+
+async def _main() -> None:
+    from app.database import connect_to_mongo, close_mongo_connection
+
+    parser = argparse.ArgumentParser(description="Maintain the daily_spend rollup collection")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--user-id", default=None, help="Only rebuild this user's rollup")
+    args = parser.parse_args()
+
+    await connect_to_mongo()
+    try:
+        stats = await rebuild_daily_spend(args.user_id)
+        print(f"✅ daily_spend rebuilt: {stats}")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
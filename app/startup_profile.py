@@ -0,0 +1,139 @@
+# app/startup_profile.py
+"""Startup timing: how long importing the app took and how long each lifespan
+phase ran, served at /startup-profile. As a CLI it measures a cold import of
+app.main in fresh interpreters with -X importtime and can enforce a budget:
+
+    python -m app.startup_profile --budget-ms 1500
+"""
+import argparse
+import asyncio
+import importlib
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Imported lazily, on first use, by the modules that need them
+HEAVY_MODULES = ["google.generativeai", "joblib"]
+
+
+class StartupProfile:
+    def __init__(self):
+        self.imports: Dict[str, float] = {}
+        self.phases: Dict[str, float] = {}
+        self.preloaded: Dict[str, float] = {}
+
+    def record_import(self, module: str, started: float) -> None:
+        self.imports[module] = round((time.perf_counter() - started) * 1000, 2)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = round((time.perf_counter() - started) * 1000, 2)
+
+    def report(self) -> Dict:
+        return {
+            "imports_ms": dict(self.imports),
+            "lifespan_phases_ms": dict(self.phases),
+            "lifespan_total_ms": round(sum(self.phases.values()), 2),
+            "preloaded_ms": dict(self.preloaded),
+        }
+
+
+startup_profile = StartupProfile()
+
+
+def _preload(modules: List[str]) -> None:
+    for name in modules:
+        started = time.perf_counter()
+        try:
+            if name == "google.generativeai":
+                # Also applies the configured API key
+                from app.llm_client import load_genai
+                load_genai()
+            else:
+                importlib.import_module(name)
+        except Exception as exc:
+            print(f"⚠️ Preloading {name} failed: {exc}")
+            continue
+        startup_profile.preloaded[name] = round((time.perf_counter() - started) * 1000, 2)
+
+
+def start_background_preload() -> Optional[asyncio.Future]:
+    """PRELOAD_HEAVY_MODULES=1 imports HEAVY_MODULES in a worker thread after
+    startup, so the first request that needs one does not pay for the import;
+    a comma-separated list picks the modules instead.
+    """
+    setting = os.getenv("PRELOAD_HEAVY_MODULES", "0").strip()
+    if setting.lower() in ("", "0", "false", "no", "off"):
+        return None
+    modules = HEAVY_MODULES if setting.lower() in ("1", "true", "yes", "on") else [m.strip() for m in setting.split(",") if m.strip()]
+    return asyncio.get_running_loop().run_in_executor(None, _preload, modules)
+
+
+# ========== CLI: cold-import profile ==========
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)\s*$")
+
+
+def _cold_import(module: str) -> Tuple[float, Dict[str, float], List[str]]:
+    """Import `module` in a fresh interpreter; return its cumulative import time
+    and self time per top-level package (both in ms) and every module imported.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=os.getcwd(),
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    total = 0.0
+    packages: Dict[str, float] = defaultdict(float)
+    modules: List[str] = []
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, _, name = match.groups()
+        packages[name.split(".")[0]] += int(self_us) / 1000
+        modules.append(name)
+        if name == module:
+            total = int(cumulative_us) / 1000
+    return total, dict(packages), modules
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure cold import time of the API")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters to try; the fastest counts")
+    parser.add_argument("--top", type=int, default=15, help="Packages to list by self time")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="Check mode: exit non-zero when the import takes longer or pulls in a lazily loaded module")
+    args = parser.parse_args(argv)
+
+    runs = [_cold_import(args.module) for _ in range(max(1, args.repeat))]
+    total, packages, modules = min(runs, key=lambda run: run[0])
+    print(f"import {args.module}: {total:.1f} ms (best of {len(runs)})")
+    for name, ms in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {ms:8.1f} ms  {name}")
+    eager = [heavy for heavy in HEAVY_MODULES if any(m == heavy or m.startswith(heavy + ".") for m in modules)]
+    if eager:
+        print(f"⚠️ Imported at startup although loaded lazily: {', '.join(eager)}")
+
+    if args.budget_ms is None:
+        return 0
+    if total > args.budget_ms:
+        print(f"❌ Startup import budget exceeded: {total:.1f} ms > {args.budget_ms:.1f} ms")
+        return 1
+    if eager:
+        return 1
+    print(f"✅ Within startup import budget of {args.budget_ms:.1f} ms")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
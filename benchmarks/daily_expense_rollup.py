@@ -0,0 +1,93 @@
+# benchmarks/daily_expense_rollup.py
+"""Compare the old fetch-everything + pandas groupby path with the server-side
+aggregation used by get_user_transactions.
+
+Seeds a throwaway database (financial_app_bench by default) on MONGODB_URL.
+
+    python -m benchmarks.daily_expense_rollup
+"""
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+
+import certifi
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.smart_saving_agent import daily_expense_pipeline
+
+SIZES = [1_000, 10_000, 100_000]
+DAYS = 365
+REPEATS = 5
+
+
+async def legacy_daily_expenses(collection, user_id: str, start_date: datetime, end_date: datetime) -> pd.DataFrame:
+	cursor = collection.find({
+		"user_id": user_id,
+		"date": {"$gte": start_date, "$lte": end_date},
+		"transaction_type": "expense",
+	}).sort("date", 1)
+	transactions = await cursor.to_list(None)
+	df = pd.DataFrame([{"date": tx["date"], "expense": tx["amount"], "category": tx.get("category", "unknown")} for tx in transactions])
+	df["date"] = pd.to_datetime(df["date"])
+	return df.groupby(df["date"].dt.date)["expense"].sum().reset_index()
+
+
+async def pipeline_daily_expenses(collection, user_id: str, start_date: datetime, end_date: datetime) -> list:
+	return await collection.aggregate(daily_expense_pipeline(user_id, start_date, end_date)).to_list(None)
+
+
+async def seed(collection, user_id: str, n: int, end_date: datetime) -> None:
+	rng = np.random.default_rng(n)
+	offsets = rng.uniform(0, DAYS * 86400, size=n)
+	amounts = rng.uniform(1, 200, size=n).round(2)
+	categories = ["food", "rent", "transport", "fun", "bills"]
+	docs = [{
+		"user_id": user_id,
+		"amount": float(amounts[i]),
+		"category": categories[i % len(categories)],
+		"description": "bench",
+		"transaction_type": "expense",
+		"date": end_date - timedelta(seconds=float(offsets[i])),
+	} for i in range(n)]
+	for i in range(0, n, 10_000):
+		await collection.insert_many(docs[i:i + 10_000], ordered=False)
+
+
+async def timed(fn, *args) -> float:
+	best = float("inf")
+	for _ in range(REPEATS):
+		start = time.perf_counter()
+		await fn(*args)
+		best = min(best, time.perf_counter() - start)
+	return best * 1000
+
+
+async def main() -> None:
+	load_dotenv()
+	client = AsyncIOMotorClient(os.environ["MONGODB_URL"], tlsCAFile=certifi.where())
+	database = client[os.getenv("BENCH_DATABASE", "financial_app_bench")]
+	collection = database.transactions
+	await collection.create_index([("user_id", 1), ("transaction_type", 1), ("date", 1)])
+	end_date = datetime.utcnow()
+	start_date = end_date - timedelta(days=DAYS)
+
+	print(f"{'transactions':>12} {'legacy ms':>10} {'pipeline ms':>12} {'speedup':>8}")
+	try:
+		for n in SIZES:
+			user_id = f"bench-user-{n}"
+			await collection.delete_many({"user_id": user_id})
+			await seed(collection, user_id, n, end_date)
+			legacy = await timed(legacy_daily_expenses, collection, user_id, start_date, end_date)
+			pipeline = await timed(pipeline_daily_expenses, collection, user_id, start_date, end_date)
+			print(f"{n:>12} {legacy:>10.1f} {pipeline:>12.1f} {legacy / pipeline:>7.1f}x")
+	finally:
+		await client.drop_database(database.name)
+		client.close()
+
+
+if __name__ == "__main__":
+	asyncio.run(main())
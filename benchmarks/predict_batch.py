@@ -0,0 +1,65 @@
+# benchmarks/predict_batch.py
+"""Rows/sec for /api/predict_spending_batch input handling: the original
+row-by-row path versus the vectorized row path and the columnar format.
+Each measurement includes request parsing, matrix build, predict and output
+conversion, which is everything the handler does besides HTTP.
+
+    python -m benchmarks.predict_batch
+"""
+import json
+import time
+
+import numpy as np
+
+from app.models import PredictBatchRequest
+from app.inference_executor import as_float_list
+from app.routers.predict import _batch_matrix, _row_from_features
+from app.simple_models import LinearSumModel
+
+FEATURES = ["income", "rent", "groceries", "utilities"]
+SIZES = [1_000, 10_000, 50_000]
+REPEATS = 5
+
+
+def legacy_path(body: bytes, model) -> list:
+	payload = PredictBatchRequest.model_validate_json(body)
+	matrix = [_row_from_features(item, FEATURES) for item in payload.batch]
+	pred = model.predict(matrix)
+	return [float(x) for x in (pred.tolist() if hasattr(pred, "tolist") else pred)]
+
+
+def vectorized_path(body: bytes, model) -> list:
+	payload = PredictBatchRequest.model_validate_json(body)
+	return as_float_list(model.predict(_batch_matrix(payload, FEATURES)))
+
+
+def best_seconds(fn, *args) -> float:
+	best = float("inf")
+	for _ in range(REPEATS):
+		start = time.perf_counter()
+		fn(*args)
+		best = min(best, time.perf_counter() - start)
+	return best
+
+
+def main() -> None:
+	rng = np.random.default_rng(0)
+	model = LinearSumModel(rng.uniform(0, 1, size=len(FEATURES)), 10.0)
+	print(f"{'rows':>8} {'legacy rows/s':>14} {'rows rows/s':>12} {'columnar rows/s':>16}")
+	for n in SIZES:
+		values = rng.uniform(0, 5000, size=(n, len(FEATURES))).round(2)
+		row_body = json.dumps({"batch": [dict(zip(FEATURES, row)) for row in values.tolist()]}).encode()
+		column_body = json.dumps({"columns": {name: values[:, i].tolist() for i, name in enumerate(FEATURES)}}).encode()
+
+		expected = legacy_path(row_body, model)
+		assert np.allclose(vectorized_path(row_body, model), expected)
+		assert np.allclose(vectorized_path(column_body, model), expected)
+
+		legacy = n / best_seconds(legacy_path, row_body, model)
+		rows = n / best_seconds(vectorized_path, row_body, model)
+		columnar = n / best_seconds(vectorized_path, column_body, model)
+		print(f"{n:>8} {legacy:>14,.0f} {rows:>12,.0f} {columnar:>16,.0f}")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,84 @@
+# benchmarks/savings_engine.py
+"""Per-call latency and peak allocation of the savings math (EWMA, trend forecast
+and summary stats) for one user's series: the previous pandas implementation
+versus app.savings_engine. No database is needed.
+
+    python -m benchmarks.savings_engine
+"""
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from app.savings_engine import ewma, forecast
+
+SIZES = [30, 90, 365]
+REPEATS = 200
+
+
+def legacy_analysis(expenses: pd.DataFrame) -> tuple:
+    # compute_ewma + forecast_expenses + the summary stats, as they were with pandas
+    expenses = expenses.copy()
+    expenses['ewma'] = expenses['expense'].ewm(span=7, adjust=False).mean()
+
+    expenses = expenses.copy()
+    expenses['day'] = np.arange(len(expenses))
+    coef = np.polyfit(expenses['day'], expenses['expense'], 1)
+    trend = np.poly1d(coef)
+    last_day = expenses['day'].iloc[-1]
+    forecast_values = trend(np.arange(last_day + 1, last_day + 8))
+    future_dates = [expenses['date'].iloc[-1] + timedelta(days=i + 1) for i in range(7)]
+    forecast_df = pd.DataFrame({"date": future_dates, "forecast_expense": forecast_values})
+
+    stats = (
+        float(expenses['expense'].sum()), float(expenses['expense'].mean()),
+        float(expenses['expense'].max()), float(expenses['expense'].min()),
+    )
+    return expenses['ewma'].to_numpy(), forecast_df, stats
+
+
+def numpy_analysis(dates: np.ndarray, values: np.ndarray) -> tuple:
+    smoothed = ewma(values, span=7)
+    forecast_dates, forecast_values = forecast(dates, values, horizon=7)
+    stats = (float(values.sum()), float(values.mean()), float(values.max()), float(values.min()))
+    return smoothed, (forecast_dates, forecast_values), stats
+
+
+def measure(fn, *args) -> tuple:
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    # Peak bytes allocated from Python's allocator during one call
+    tracemalloc.start()
+    fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best * 1e6, peak / 1024
+
+
+def main() -> None:
+    rng = np.random.default_rng(0)
+    print(f"{'days':>6} {'pandas us':>10} {'numpy us':>9} {'speedup':>8} {'pandas peak KiB':>16} {'numpy peak KiB':>15}")
+    for n in SIZES:
+        start = datetime(2024, 1, 1)
+        dates = np.array([start + timedelta(days=i) for i in range(n)], dtype="datetime64[us]")
+        values = rng.uniform(0, 2000, size=n).round(2)
+        frame = pd.DataFrame({"date": pd.to_datetime(dates), "expense": values})
+
+        old_ewma, old_forecast, old_stats = legacy_analysis(frame)
+        new_ewma, (new_dates, new_values), new_stats = numpy_analysis(dates, values)
+        assert np.array_equal(old_ewma, new_ewma) and old_stats == new_stats
+        assert np.allclose(old_forecast["forecast_expense"].to_numpy(), new_values, rtol=1e-12)
+        assert list(old_forecast["date"]) == [pd.Timestamp(d) for d in new_dates]
+
+        legacy_us, legacy_kib = measure(legacy_analysis, frame)
+        numpy_us, numpy_kib = measure(numpy_analysis, dates, values)
+        print(f"{n:>6} {legacy_us:>10.1f} {numpy_us:>9.1f} {legacy_us / numpy_us:>7.1f}x {legacy_kib:>16.1f} {numpy_kib:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# benchmarks/serialization.py
+"""Per-document cost of turning Mongo documents into a JSON list response:
+the original path (Model(**doc) per document, then FastAPI's response_model
+validation, jsonable_encoder and JSONResponse) versus json_list_response.
+No database is needed; documents are generated in the shape Motor returns.
+
+    python -m benchmarks.serialization
+"""
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.models import LoanModel, NotificationModel, TransactionModel
+from app.serialization import json_list_response
+
+SIZES = [200, 10_000]
+REPEATS = 5
+
+
+def make_docs(model, n: int) -> List[dict]:
+    now = datetime(2024, 1, 1)
+    if model is TransactionModel:
+        return [{
+            "_id": ObjectId(), "user_id": "user_1", "amount": float(i % 500), "category": "groceries",
+            "description": f"purchase {i}", "date": now - timedelta(minutes=i), "transaction_type": "expense",
+        } for i in range(n)]
+    if model is LoanModel:
+        return [{
+            "_id": ObjectId(), "lender_id": "user_1", "borrower_id": f"user_{i}", "amount": float(i),
+            "due_date": now + timedelta(days=i % 30), "status": "pending", "created_at": now, "repaid_at": None,
+        } for i in range(n)]
+    return [{
+        "_id": ObjectId(), "user_id": "user_1", "loan_id": str(ObjectId()), "type": "loan_created",
+        "message": f"You received a loan of {i}.0", "created_at": now - timedelta(minutes=i), "read": bool(i % 2),
+    } for i in range(n)]
+
+
+def legacy_path(model, field, docs: List[dict]) -> bytes:
+    content = [model(**doc) for doc in docs]
+    serialized = asyncio.run(serialize_response(field=field, response_content=content))
+    return JSONResponse(serialized).body
+
+
+def fast_path(model, docs: List[dict]) -> bytes:
+    return json_list_response(model, docs).body
+
+
+def best_seconds(fn, model, *args) -> float:
+    best = float("inf")
+    for _ in range(REPEATS):
+        # Fresh dicts per run, as Motor hands each request
+        docs = [dict(doc) for doc in args[-1]]
+        start = time.perf_counter()
+        fn(model, *args[:-1], docs)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    print(f"{'model':>18} {'docs':>7} {'legacy us/doc':>14} {'fast us/doc':>12} {'speedup':>8}")
+    for model in (TransactionModel, LoanModel, NotificationModel):
+        field = create_response_field(name="response", type_=List[model], mode="serialization")
+        for n in SIZES:
+            docs = make_docs(model, n)
+            assert json.loads(legacy_path(model, field, [dict(d) for d in docs])) == json.loads(fast_path(model, [dict(d) for d in docs]))
+            legacy = best_seconds(legacy_path, model, field, docs) / n * 1e6
+            fast = best_seconds(fast_path, model, docs) / n * 1e6
+            print(f"{model.__name__:>18} {n:>7} {legacy:>14.2f} {fast:>12.2f} {legacy / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+# tests/conftest.py
+import os
+
+# Index bootstrap runs explain() on hot queries, which the in-process Mongo stand-in does not support
+os.environ.setdefault("VERIFY_QUERY_PLANS", "0")
+
+import pytest
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+
+from app.database import db
+
+
+@pytest.fixture
+def mongo():
+    """In-process Mongo stand-in installed as the app database"""
+    db.client = AsyncMongoMockClient()
+    db.database = db.client.test
+    yield db.database
+    db.client = None
+    db.database = None
+
+
+@pytest.fixture
+def client(mongo):
+    """TestClient with the lifespan running against the stand-in database"""
+    from app.main import app
+    with TestClient(app) as test_client:
+        yield test_client
@@ -0,0 +1,120 @@
+# tests/test_auth.py
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app import auth
+from app.auth import TokenVerifier
+
+
+def _keypair():
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo,
+    ).decode()
+    return private_key, public_pem
+
+
+@pytest.fixture(scope="module")
+def keypair():
+    return _keypair()
+
+
+def _token(private_key, expires_in: float = 300, **claims) -> str:
+    return jwt.encode({"sub": "user_1", "exp": int(time.time() + expires_in), **claims}, private_key, algorithm="RS256")
+
+
+def test_valid_token(keypair):
+    private_key, public_pem = keypair
+    verifier = TokenVerifier(public_pem)
+    assert verifier.verify(_token(private_key))["sub"] == "user_1"
+    assert verifier.verify_ms.snapshot()["count"] == 1
+
+
+def test_repeat_token_served_from_cache(keypair):
+    private_key, public_pem = keypair
+    verifier = TokenVerifier(public_pem)
+    token = _token(private_key)
+    first = verifier.verify(token)
+    assert verifier.verify(token) == first
+    # The second call skipped the signature check
+    assert verifier.verify_ms.snapshot()["count"] == 1
+    assert verifier.stats()["cache"]["hits"] == 1
+
+
+def test_expired_token(keypair):
+    private_key, public_pem = keypair
+    verifier = TokenVerifier(public_pem)
+    with pytest.raises(HTTPException) as exc_info:
+        verifier.verify(_token(private_key, expires_in=-10))
+    assert exc_info.value.status_code == 401
+    assert exc_info.value.detail == "Token expired"
+    assert verifier.failures["expired"] == 1
+
+
+def test_token_signed_with_foreign_key(keypair):
+    _, public_pem = keypair
+    foreign_private_key, _ = _keypair()
+    verifier = TokenVerifier(public_pem)
+    with pytest.raises(HTTPException) as exc_info:
+        verifier.verify(_token(foreign_private_key))
+    assert exc_info.value.status_code == 401
+    assert exc_info.value.detail == "Invalid token"
+    assert verifier.failures["invalid"] == 1
+
+
+def test_cached_claims_expire_at_exp(keypair):
+    private_key, public_pem = keypair
+    verifier = TokenVerifier(public_pem)
+    token = _token(private_key, expires_in=1)
+    exp = jwt.decode(token, options={"verify_signature": False})["exp"]
+    verifier.verify(token)
+    while time.time() <= exp:
+        time.sleep(0.05)
+    # Past exp the cached claims are gone, so the token is verified again and rejected
+    with pytest.raises(HTTPException) as exc_info:
+        verifier.verify(token)
+    assert exc_info.value.detail == "Token expired"
+
+
+@pytest.fixture
+def auth_enabled(keypair, monkeypatch):
+    monkeypatch.setattr(auth, "AUTH_ENABLED", True)
+    monkeypatch.setattr(auth, "_token_verifier", TokenVerifier(keypair[1]))
+
+
+def test_missing_header_is_rejected(auth_enabled):
+    from app.main import app
+    # No lifespan: the dependency rejects the request before any database access
+    response = TestClient(app).get("/api/users/")
+    assert response.status_code == 401
+    assert response.headers["WWW-Authenticate"] == "Bearer"
+
+
+def test_route_accepts_valid_bearer_token(auth_enabled, keypair, client):
+    response = client.get("/api/users/", headers={"Authorization": f"Bearer {_token(keypair[0])}"})
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("key", ["pk_test_abc123", None])
+def test_unusable_key_keeps_routes_closed(monkeypatch, keypair, key):
+    if key is None:
+        monkeypatch.delenv("CLERK_JWT_KEY", raising=False)
+    else:
+        monkeypatch.setenv("CLERK_JWT_KEY", key)
+    monkeypatch.setattr(auth, "AUTH_ENABLED", True)
+    monkeypatch.setattr(auth, "_token_verifier", None)
+    monkeypatch.setattr(auth, "_key_error", None)
+    auth.init_auth()
+    assert auth.AUTH_ENABLED is True
+
+    from app.main import app
+    client = TestClient(app)
+    assert client.get("/api/users/").status_code == 503
+    response = client.get("/api/users/", headers={"Authorization": f"Bearer {_token(keypair[0])}"})
+    assert response.status_code == 503
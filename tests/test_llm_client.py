@@ -0,0 +1,90 @@
+# tests/test_llm_client.py
+import asyncio
+
+import pytest
+
+from app.llm_client import CircuitBreaker, LLMClient, LLMUnavailableError
+
+
+class ScriptedBackend:
+    def __init__(self):
+        self.mode = "fail"
+
+    async def generate(self, prompt: str) -> str:
+        if self.mode == "fail":
+            raise RuntimeError("boom")
+        if self.mode == "hang":
+            await asyncio.sleep(60)
+        return "ok"
+
+
+async def _half_open_client():
+    backend = ScriptedBackend()
+    client = LLMClient(backend, timeout=5, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0.01))
+    with pytest.raises(LLMUnavailableError):
+        await client.generate("p")
+    await asyncio.sleep(0.02)
+    assert client.breaker.state == "half_open"
+    return client, backend
+
+
+def test_cancelled_probe_releases_half_open_slot():
+    async def scenario():
+        client, backend = await _half_open_client()
+        backend.mode = "hang"
+        probe = asyncio.create_task(client.generate("p"))
+        await asyncio.sleep(0.01)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        backend.mode = "ok"
+        assert await client.generate("p") == "ok"
+        assert client.breaker.state == "closed"
+
+    asyncio.run(scenario())
+
+
+def test_half_open_admits_a_single_probe():
+    async def scenario():
+        client, backend = await _half_open_client()
+        backend.mode = "hang"
+        probe = asyncio.create_task(client.generate("p"))
+        await asyncio.sleep(0.01)
+        with pytest.raises(LLMUnavailableError, match="half_open"):
+            await client.generate("p")
+        probe.cancel()
+        await asyncio.gather(probe, return_exceptions=True)
+
+    asyncio.run(scenario())
+
+
+def test_local_queue_timeouts_do_not_open_the_breaker():
+    from app.llm_client import FakeBackend
+
+    async def scenario():
+        client = LLMClient(FakeBackend(latency=0.2), timeout=0.5, max_concurrency=2,
+                           breaker=CircuitBreaker(failure_threshold=5, reset_timeout=30))
+        results = await asyncio.gather(*(client.generate("p") for _ in range(20)), return_exceptions=True)
+        succeeded = sum(1 for result in results if result == "Fake savings suggestions")
+        assert succeeded == client.stats["succeeded"] >= 2
+        assert client.stats["saturated"] == 20 - succeeded
+        assert client.stats["timeouts"] == client.stats["errors"] == 0
+        assert client.breaker.state == "closed"
+        # The healthy backend keeps serving once the burst has drained
+        assert await client.generate("p") == "Fake savings suggestions"
+
+    asyncio.run(scenario())
+
+
+def test_slow_backend_still_trips_the_breaker():
+    async def scenario():
+        backend = ScriptedBackend()
+        backend.mode = "hang"
+        client = LLMClient(backend, timeout=0.05, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=30))
+        for _ in range(2):
+            with pytest.raises(LLMUnavailableError):
+                await client.generate("p")
+        assert client.stats["timeouts"] == 2
+        assert client.breaker.state == "open"
+
+    asyncio.run(scenario())
@@ -0,0 +1,41 @@
+# tests/test_loans.py
+import asyncio
+
+import httpx
+
+from app.main import app
+
+CONCURRENT_REPAYS = 10
+
+
+def test_concurrent_repays_settle_the_loan_once(client):
+    loan = client.post("/api/create_loan", json={
+        "lender_id": "lender", "borrower_id": "borrower", "amount": 30, "due_date": "2030-01-01T00:00:00",
+    })
+    assert loan.status_code == 201
+    loan_id = loan.json()["_id"]
+
+    async def race():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            responses = await asyncio.gather(*(
+                http.post("/api/repay_loan", json={"loan_id": loan_id}) for _ in range(CONCURRENT_REPAYS)
+            ))
+        return sorted(response.status_code for response in responses)
+
+    assert client.portal.call(race) == [200] + [400] * (CONCURRENT_REPAYS - 1)
+
+
+def test_created_at_echo_matches_stored_value(client):
+    created = client.post("/api/users/", json={"email": "echo@example.com", "name": "Echo", "clerk_user_id": "echo"})
+    assert created.status_code == 201
+    fetched = client.get("/api/users/echo")
+    assert fetched.json()["created_at"] == created.json()["created_at"]
+
+
+def test_loan_echo_matches_stored_value(client):
+    created = client.post("/api/create_loan", json={
+        "lender_id": "lender", "borrower_id": "borrower", "amount": 5, "due_date": "2030-01-01T12:00:00.123456",
+    }).json()
+    (stored,) = client.get("/api/loans/user/lender").json()
+    assert (stored["created_at"], stored["due_date"]) == (created["created_at"], created["due_date"])
@@ -0,0 +1,39 @@
+# tests/test_savings_cache.py
+import asyncio
+
+from app.savings_cache import SavingsAnalysisCache
+
+
+def test_invalidations_do_not_accumulate_per_user_state():
+    cache = SavingsAnalysisCache()
+
+    async def scenario():
+        for i in range(1000):
+            cache.invalidate_user(f"user-{i}")
+        await cache.get_or_compute("u", 30, lambda: asyncio.sleep(0, {"total": 1}))
+        cache.invalidate_user("u")
+
+    asyncio.run(scenario())
+    assert cache._generations == {} and cache._in_flight == {}
+
+
+def test_write_during_analysis_keeps_stale_result_out():
+    cache = SavingsAnalysisCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"total": len(calls)}
+
+    async def scenario():
+        running = asyncio.create_task(cache.get_or_compute("u", 30, compute))
+        await asyncio.sleep(0)
+        cache.invalidate_user("u")
+        assert (await running) == {"total": 1}
+        # Not cached: the next call computes again, and that result is cached
+        assert await cache.get_or_compute("u", 30, compute) == {"total": 2}
+        assert await cache.get_or_compute("u", 30, compute) == {"total": 2}
+
+    asyncio.run(scenario())
+    assert cache._generations == {} and cache._in_flight == {}
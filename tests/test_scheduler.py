@@ -0,0 +1,114 @@
+# tests/test_scheduler.py
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import scheduler
+from app.leader_lock import LeaseLock, claim_shards
+
+
+async def _insert_due_loans(mongo, now: datetime) -> int:
+    # One loan due a few minutes ago (earlier today) plus older ones spread over weeks
+    due_dates = [now - timedelta(minutes=5)] + [now - timedelta(days=days) for days in range(1, 40)]
+    await mongo.loans.insert_many([
+        {"lender_id": "l", "borrower_id": "b", "amount": i, "due_date": due, "status": "pending"}
+        for i, due in enumerate(due_dates)
+    ])
+    return len(due_dates)
+
+
+@pytest.mark.parametrize("shards", [1, 3])
+def test_concurrent_nightly_sweeps_run_once(mongo, monkeypatch, shards):
+    monkeypatch.setattr(scheduler, "OVERDUE_SWEEP_SHARDS", shards)
+
+    async def scenario():
+        loans = await _insert_due_loans(mongo, datetime.utcnow())
+        results = await asyncio.gather(*(scheduler.run_overdue_sweep() for _ in range(3)))
+        marked = sum(result["marked_overdue"] for result in results if result)
+        # Same upper bound in both modes: the loan due earlier today is included
+        assert marked == loans
+        assert await mongo.loans.count_documents({"status": "overdue"}) == loans
+        assert await mongo.notifications.count_documents({"type": "loan_overdue"}) == loans
+        # The day's run is done: a late worker does nothing
+        late = await scheduler.run_overdue_sweep()
+        assert late is None or late["shards"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_manual_sweep_waits_for_held_shard_lease(mongo, monkeypatch):
+    monkeypatch.setattr(scheduler, "OVERDUE_SWEEP_SHARDS", 2)
+
+    async def scenario():
+        await _insert_due_loans(mongo, datetime.utcnow())
+        held = LeaseLock("check_overdue_loans:0", ttl_seconds=60)
+        assert await held.acquire()
+        result = await scheduler.run_overdue_sweep(nightly=False)
+        # Only the free shard ran; the newest shard is still held by the "nightly" holder
+        assert result["shards"] == 1
+        assert await mongo.loans.count_documents({"status": "overdue", "due_date": {"$gte": scheduler.day_start(datetime.utcnow()) - timedelta(days=7)}}) == 0
+
+    asyncio.run(scenario())
+
+
+def test_expired_lease_is_taken_over(mongo):
+    async def scenario():
+        first, second = LeaseLock("job", ttl_seconds=0.1), LeaseLock("job", ttl_seconds=0.1)
+        assert await first.acquire()
+        assert not await second.acquire()
+        await asyncio.sleep(0.15)
+        assert await second.acquire()
+        assert not await first.renew()
+
+    asyncio.run(scenario())
+
+
+def test_shards_split_between_claimants(mongo):
+    async def scenario():
+        claimed = {}
+
+        async def worker(name):
+            async for shard in claim_shards("sweep", [str(i) for i in range(6)], "run-1"):
+                claimed.setdefault(name, []).append(shard)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(worker("a"), worker("b"))
+        assert sorted(claimed["a"] + claimed["b"]) == [str(i) for i in range(6)]
+        assert claimed["a"] and claimed["b"]
+
+    asyncio.run(scenario())
+
+
+def test_snapshot_forecast_and_suggestions_match_live_analysis(mongo, monkeypatch):
+    from app import smart_saving_agent
+    from app.spend_rollup import record_expenses
+
+    prompts = []
+
+    class RecordingClient:
+        async def generate(self, prompt):
+            prompts.append(prompt)
+            return "llm suggestions"
+
+    monkeypatch.setattr(smart_saving_agent, "get_llm_client", RecordingClient)
+
+    async def scenario():
+        today = scheduler.day_start(datetime.utcnow())
+        await record_expenses("u", [
+            {"amount": 100.0 + 50 * (k % 7), "date": today - timedelta(days=k), "transaction_type": "expense", "category": "food"}
+            for k in range(20)
+        ])
+        await scheduler.build_savings_snapshots()
+        snapshot = await scheduler.get_savings_snapshot("u", 30)
+        live = await smart_saving_agent.analyze_user_savings("u", 30)
+        assert snapshot["forecast_model"] == live["forecast_model"] == "holt_winters"
+        assert [point["forecast_expense"] for point in snapshot["forecast"]] == pytest.approx(
+            [point["forecast_expense"] for point in live["forecast"]]
+        )
+        # The summary asks the LLM with the same prompt as the live analysis, once per snapshot
+        assert await smart_saving_agent.get_snapshot_suggestions(snapshot) == "llm suggestions"
+        assert await smart_saving_agent.get_snapshot_suggestions(snapshot) == "llm suggestions"
+        assert len(prompts) == 2 and prompts[0] == prompts[1]
+
+    asyncio.run(scenario())
@@ -0,0 +1,17 @@
+# tests/test_startup.py
+import os
+
+from app import startup_profile
+
+# Cold import of app.main is about 1.1s on a developer machine; the budget leaves room for slow CI hosts
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "4000"))
+
+
+def test_cold_import_within_budget():
+    assert startup_profile.main(["--budget-ms", str(STARTUP_BUDGET_MS), "--repeat", "2"]) == 0
+
+
+def test_heavy_modules_are_not_imported_at_startup():
+    _, _, modules = startup_profile._cold_import("app.main")
+    for heavy in startup_profile.HEAVY_MODULES:
+        assert not any(name == heavy or name.startswith(heavy + ".") for name in modules), heavy
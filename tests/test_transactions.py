@@ -0,0 +1,80 @@
+# tests/test_transactions.py
+
+from app import bulk_import
+from app.database import db
+
+EXPENSE = {"amount": 12.5, "category": "food", "description": "lunch", "transaction_type": "expense"}
+
+
+def _create_user(client, user_id: str = "u1") -> None:
+    response = client.post("/api/users/", json={"email": f"{user_id}@example.com", "name": "A", "clerk_user_id": user_id})
+    assert response.status_code == 201
+
+
+def _count(client, collection: str, query: dict) -> int:
+    return client.portal.call(db.database[collection].count_documents, query)
+
+
+def test_create_transaction_survives_rollup_failure(client, monkeypatch):
+    _create_user(client)
+
+    async def broken(*args, **kwargs):
+        raise RuntimeError("rollup down")
+
+    monkeypatch.setattr(bulk_import, "record_expenses", broken)
+    monkeypatch.setattr(bulk_import, "observe_expenses", broken)
+    response = client.post("/api/transactions/", params={"user_id": "u1"}, json=EXPENSE)
+    assert response.status_code == 201
+    assert _count(client, "transactions", {"user_id": "u1"}) == 1
+
+
+def test_bulk_import_survives_rollup_failure(client, monkeypatch):
+    _create_user(client)
+
+    async def broken(*args, **kwargs):
+        raise RuntimeError("rollup down")
+
+    monkeypatch.setattr(bulk_import, "record_expenses", broken)
+    body = "\n".join(['{"amount": 1, "category": "food", "description": "x", "transaction_type": "expense"}'] * 3)
+    response = client.post("/api/transactions/bulk", params={"user_id": "u1", "format": "ndjson"}, content=body)
+    assert response.status_code == 200
+    assert response.json()["inserted"] == 3
+    assert _count(client, "transactions", {"user_id": "u1"}) == 3
+
+
+def test_bulk_import_reports_rows_of_a_failed_chunk(client, monkeypatch):
+    from pymongo.errors import AutoReconnect
+
+    _create_user(client)
+    collection_type = type(db.database.transactions)
+    original = collection_type.insert_many
+    calls = []
+
+    async def flaky_insert_many(self, docs, *args, **kwargs):
+        calls.append(len(docs))
+        if len(calls) == 2:
+            # The connection drops after the first document of the second chunk was written
+            await original(self, docs[:1], *args, **kwargs)
+            raise AutoReconnect("connection reset")
+        return await original(self, docs, *args, **kwargs)
+
+    monkeypatch.setattr(collection_type, "insert_many", flaky_insert_many)
+    body = "\n".join(f'{{"amount": {i}, "category": "food", "description": "x", "transaction_type": "expense"}}' for i in range(1, 7))
+    response = client.post("/api/transactions/bulk", params={"user_id": "u1", "format": "ndjson", "chunk_size": 2}, content=body)
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["rows"], report["inserted"], report["failed"]) == (6, 5, 1)
+    assert [error["row"] for error in report["errors"]] == [4]
+    assert _count(client, "transactions", {"user_id": "u1"}) == 5
+
+
+def test_broken_body_stream_still_returns_the_report(client):
+    _create_user(client)
+
+    async def rows():
+        yield 1, {"amount": 1, "category": "food", "description": "x", "transaction_type": "expense"}
+        raise ConnectionResetError("client went away")
+
+    report = client.portal.call(bulk_import.import_transactions, "u1", rows())
+    assert (report["rows"], report["inserted"]) == (1, 1)
+    assert "client went away" in report["aborted"]
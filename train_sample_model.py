@@ -1,6 +1,5 @@
 # train_sample_model.py
 import json
-import pickle
 from typing import List
 
 import numpy as np
@@ -33,19 +32,18 @@ def main() -> None:
 
 	model = LinearSumModel(weights, intercept)
 
-	# Save model.pkl
-	with open("model.pkl", "wb") as f:
-		pickle.dump(model, f)
-	print("Saved trained model -> model.pkl")
+	# Save model.lsm (pickle-free, memory-mappable; carries the feature order too)
+	model.save("model.lsm", features)
+	print("Saved trained model -> model.lsm")
 
 	# Save model_features.json
 	with open("model_features.json", "w") as f:
 		json.dump({"features": features}, f)
 	print("Saved feature order -> model_features.json")
 
-	# Sanity check
+	# Sanity check against the memory-mapped copy
 	sample = np.array([[5000.0, 1200.0, 400.0, 200.0]])
-	pred = model.predict(sample)
+	pred = LinearSumModel.load("model.lsm").predict(sample)
 	print({"sample_input": sample.tolist()[0], "pred": float(pred[0])})
 
 